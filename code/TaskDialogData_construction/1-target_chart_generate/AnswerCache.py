@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import os
+import pickle
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = '.clingo_cache'
+# 缓存目录的默认容量上限 (字节), 超出后按最近使用时间淘汰
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+class AnswerCache:
+    """以 ASP 程序内容哈希为键的 Clingo 答案集磁盘缓存"""
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # 目录总大小的近似值, 首次写入时统计一次, 超出上限时才重新扫描
+        self.size = None
+
+    @staticmethod
+    def key(programs: List[bytes], draco_query: List[str], constants: Dict[str, str] = None, options=()) -> str:
+        """LP 文件内容、数据事实、常量与求解选项共同决定缓存键"""
+        h = hashlib.sha256()
+        for program in programs:
+            h.update(program)
+            h.update(b'\0')
+        for line in draco_query:
+            h.update(line.encode('utf8'))
+            h.update(b'\n')
+        h.update(repr(sorted((constants or {}).items())).encode('utf8'))
+        h.update(repr(tuple(options)).encode('utf8'))
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.bin')
+
+    def get(self, key: str) -> Tuple[bool, Optional[List[Tuple[List[str], int]]]]:
+        """返回 (是否命中, [(props, cost)]); 无答案的查询缓存为 None"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return False, None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            logger.warning("Dropped corrupt cache entry %s", path)
+            self.remove(path)
+            return False, None
+        # 命中后刷新修改时间, 淘汰时按最近使用顺序进行; 读取后条目可能已被其他进程淘汰, 值已读到, 仍算命中
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, value
+
+    def put(self, key: str, value: Optional[List[Tuple[List[str], int]]]):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp = path + '.%d.tmp' % os.getpid()
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.bin'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def evict(self):
+        """总大小超过上限时删除最久未使用的条目"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+        self.size = total
+
+    def clear(self):
+        for _, _, path in list(self.entries()):
+            self.remove(path)
+        self.size = 0
+
+    @staticmethod
+    def remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
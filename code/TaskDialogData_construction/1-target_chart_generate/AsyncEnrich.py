@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger('zxc')
+
+# OpenAI 兼容接口的地址、密钥与模型; 指向本地 mock 服务即可离线测试
+BASE_URL = os.environ.get('LLM_BASE_URL', "https://api.deepseek.com")
+API_KEY = os.environ.get('LLM_API_KEY', os.environ.get('DEEPSEEK_API_KEY', ""))
+MODEL = os.environ.get('LLM_MODEL', "deepseek-chat")
+# 同时在途的请求数上限
+MAX_CONCURRENCY = 16
+# 单次请求的超时 (秒)
+TIMEOUT = 120
+# 单个请求最多重试的次数, 超过后放弃并保留原 spec
+MAX_RETRIES = 5
+# 指数退避: 第 k 次重试前等待 min(BACKOFF_MAX, BACKOFF_BASE * 2^k) 秒, 再乘以随机抖动
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# 令牌桶限流: 每秒补充 RATE 个请求, 最多积攒 BURST 个
+RATE = 5.0
+BURST = 10
+
+
+class TokenBucket:
+    """异步令牌桶, 每个请求发出前取一个令牌"""
+
+    def __init__(self, rate: float = RATE, burst: int = BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retryable(e: Exception) -> bool:
+    """只重试暂时性错误: 超时、连接错误、429 与 5xx, 以及无法解析为 JSON 的回复;
+    其余异常 (鉴权等 4xx 与程序错误) 不重试"""
+    if isinstance(e, (asyncio.TimeoutError, json.JSONDecodeError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    if isinstance(e, openai.APIConnectionError):
+        return True
+    if isinstance(e, openai.APIStatusError):
+        return e.status_code == 429 or e.status_code >= 500
+    return False
+
+
+def request_failed(e: Exception) -> bool:
+    """单个请求的失败 (可重试的错误重试用尽, 或接口返回的错误): enrich 记录后跳过该请求, 其余异常直接抛出"""
+    if retryable(e):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(e, openai.APIError)
+
+
+class AsyncLLMClient:
+    """OpenAI 兼容接口的异步客户端, 带并发上限、超时、指数退避重试与令牌桶限流"""
+
+    def __init__(self, base_url: str = BASE_URL, api_key: str = API_KEY, model: str = MODEL,
+                 concurrency: int = MAX_CONCURRENCY, timeout: float = TIMEOUT, retries: int = MAX_RETRIES,
+                 rate: float = RATE, burst: int = BURST, client=None):
+        if client is None:
+            from openai import AsyncOpenAI
+
+            # 重试由本类负责, 关闭 SDK 自带的重试
+            client = AsyncOpenAI(base_url=base_url, api_key=api_key or "EMPTY", max_retries=0, timeout=timeout)
+        # client 也可以是任何提供 chat.completions.create 与 close 的异步客户端 (测试时使用)
+        self.client = client
+        self.model = model
+        self.timeout = timeout
+        self.retries = retries
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+
+    async def request(self, messages: List[dict]) -> str:
+        async with self.semaphore:
+            await self.bucket.acquire()
+            response = await asyncio.wait_for(
+                self.client.chat.completions.create(model=self.model, messages=messages,
+                                                    response_format={"type": "json_object"}),
+                self.timeout)
+        return response.choices[0].message.content
+
+    async def generate_json(self, messages: List[dict]):
+        """返回解析后的 JSON; 达到重试上限后抛出最后一次的异常"""
+        attempt = 0
+        while True:
+            try:
+                return json.loads(await self.request(messages))
+            except Exception as e:
+                if attempt >= self.retries or not retryable(e):
+                    raise
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning("LLM request failed (%s: %s), retry %d in %.1fs",
+                               type(e).__name__, e, attempt + 1, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def close(self):
+        await self.client.close()
+
+
+async def enrich(client: AsyncLLMClient, prompts: List[Optional[List[dict]]]) -> list:
+    """并发完成一组请求, 结果与 prompts 顺序一致; prompts 中为 None 或最终失败的请求结果为 None,
+    程序错误等其他异常照常抛出"""
+
+    async def one(index, messages):
+        if messages is None:
+            return None
+        try:
+            return await client.generate_json(messages)
+        except Exception as e:
+            if not request_failed(e):
+                raise
+            logger.error("LLM request %d failed: %s: %s", index, type(e).__name__, e)
+            return None
+
+    return await asyncio.gather(*(one(index, messages) for index, messages in enumerate(prompts)))
+
+
+def run_enrichment(jobs: Callable[[AsyncLLMClient], List[Awaitable]], **options):
+    """在新的事件循环中以同一个客户端 (共享并发上限与限流) 运行 jobs(client) 给出的全部协程"""
+
+    async def main():
+        client = AsyncLLMClient(**options)
+        try:
+            return await asyncio.gather(*jobs(client))
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
@@ -0,0 +1,250 @@
+def judgement_field(field_dict, field_list, num):
+    for field in field_list:
+        if field not in field_dict:
+            field_dict[field] = 1
+        else:
+            if field_dict[field] == num:
+                return False
+            field_dict[field] = field_dict[field] + 1
+    return True
+
+
+# 各任务的图表配额表:
+#   quotas   每类图表最多选取的数量
+#   branches 按顺序匹配候选图表, 各分支的条件互不相交; 条件可限定 layer/mark/arity (编码数)/
+#            channel (含该通道)/field (该通道带字段)/no_field (该通道不带字段)
+#   judge    (字段计数组, 同一字段最多出现的次数), 交给 judgement_field 检查
+#   judge_first 为 True 时命中分支即做字段检查, 否则只在有剩余配额的槽位上检查
+#   slots    依次取第一个条件满足且仍有配额的 (配额名, 条件, chart_type, mark)
+CHART_QUOTAS = {
+    'find_anomalies': {
+        'quotas': {'boxplot_1': 1, 'boxplot_2': 1, 'point': 1, 'point_color': 1},
+        'branches': [
+            {'when': {'mark': 'boxplot'}, 'judge': ('boxplot', 2), 'judge_first': True, 'slots': [
+                ('boxplot_1', {'arity': 1}, "Box Plot", "boxplot"),
+                ('boxplot_2', {'arity': 2}, "Box Plot", "boxplot")]},
+            {'when': {'mark': 'point'}, 'judge': ('point', 5), 'judge_first': True, 'slots': [
+                ('point', {'arity': 2}, "Scatter", "point"),
+                ('point_color', {'arity': 3, 'channel': 'color'}, "Grouping Scatter", "point")]},
+        ]},
+    'find_extremum': {
+        'quotas': {'bar': 1, 'stack_bar': 1, 'point': 1, 'point_color': 1},
+        'branches': [
+            {'when': {'mark': 'bar'}, 'slots': [
+                ('bar', {'arity': 2}, "Bar", "bar"),
+                ('stack_bar', {'arity': 3}, "Stacked Bar", "bar")]},
+            {'when': {'mark': 'point'}, 'slots': [
+                ('point', {'arity': 2}, "Scatter", "point"),
+                ('point_color', {'arity': 3, 'channel': 'color'}, "Grouping Scatter", "point")]},
+        ]},
+    'part_to_whole': {
+        'quotas': {'pie_no_field': 2, 'pie_field': 2},
+        'branches': [
+            {'when': {'field': 'theta'}, 'judge': ('pie', 5), 'slots': [
+                ('pie_field', {}, "Pie", "arc")]},
+            {'when': {'no_field': 'theta'}, 'judge': ('pie', 5), 'slots': [
+                ('pie_no_field', {}, "Pie", "arc")]},
+        ]},
+    'change_over_time': {
+        'quotas': {'area': 1, 'stack_area': 2, 'line': 1, 'stack_line': 2},
+        'branches': [
+            {'when': {'mark': 'area'}, 'judge': ('area', 10), 'judge_first': True, 'slots': [
+                ('area', {'arity': 2}, "Area", "area"),
+                ('stack_area', {'arity': 3}, "Stacked Area", "area")]},
+            {'when': {'mark': 'line'}, 'judge': ('line', 10), 'judge_first': True, 'slots': [
+                ('line', {'arity': 2}, "Line", "line"),
+                ('stack_line', {'arity': 3}, "Grouping Line", "line")]},
+        ]},
+    'retrieve_value': {
+        'quotas': {'rect': 1, 'rect_field': 1},
+        'branches': [
+            {'when': {'field': 'color'}, 'judge': ('rect', 5), 'slots': [
+                ('rect_field', {}, "Heatmap", "rect")]},
+            {'when': {'no_field': 'color'}, 'judge': ('rect', 5), 'slots': [
+                ('rect', {}, "Heatmap", "rect")]},
+        ]},
+    'trend': {
+        'quotas': {'point': 2},
+        'branches': [
+            {'when': {}, 'judge': ('point', 3), 'slots': [
+                ('point', {}, "Scatter", "point")]},
+        ]},
+    'characterize_distribution': {
+        # point_size/point_shape 没有配额, 视为 0
+        'quotas': {'boxplot_1': 1, 'boxplot_2': 1, 'histogram': 2, 'point': 1, 'point_color': 1},
+        'branches': [
+            {'when': {'mark': 'boxplot'}, 'judge': ('boxplot', 2), 'judge_first': True, 'slots': [
+                ('boxplot_1', {'arity': 1}, "Box Plot", "boxplot"),
+                ('boxplot_2', {'arity': 2}, "Box Plot", "boxplot")]},
+            {'when': {'mark': 'point'}, 'judge': ('point', 5), 'judge_first': True, 'slots': [
+                ('point', {'arity': 2}, "Scatter", "point"),
+                ('point_size', {'arity': 3, 'channel': 'size'}, "Bubble Scatter", "point"),
+                ('point_color', {'arity': 3, 'channel': 'color'}, "Grouping Scatter", "point"),
+                ('point_shape', {'arity': 3, 'channel': 'shape'}, "Grouping Scatter", "point")]},
+            {'when': {'mark': 'bar'}, 'judge': ('histogram', 3), 'slots': [
+                ('histogram', {}, "Histogram", "bar")]},
+        ]},
+    'comparison': {
+        'quotas': {'bar': 1, 'line_color': 1, 'point_color': 1},
+        'branches': [
+            {'when': {'mark': 'bar'}, 'judge': ('bar', 3), 'slots': [
+                ('bar', {}, "Bar", "bar")]},
+            {'when': {'mark': 'point'}, 'slots': [
+                ('point_color', {'channel': 'color'}, "Grouping Scatter", "point")]},
+            {'when': {'mark': 'line'}, 'judge': ('line', 3), 'slots': [
+                ('line_color', {}, "Grouping Line", "line")]},
+        ]},
+    'compute_derived_value': {
+        'quotas': {'bar': 1, 'stack_bar': 1, 'rect': 1, 'arc': 1, 'arc_no_field': 1},
+        'branches': [
+            {'when': {'layer': True}, 'judge': ('rect', 3), 'slots': [
+                ('rect', {}, "Heatmap", "rect")]},
+            {'when': {'layer': False, 'mark': 'bar'}, 'slots': [
+                ('bar', {'arity': 2}, "Bar", "bar"),
+                ('stack_bar', {'arity': 3}, "Stacked Bar", "bar")]},
+            {'when': {'layer': False, 'mark': 'arc'}, 'judge': ('pie', 3), 'judge_first': True, 'slots': [
+                ('arc', {'no_field': 'theta'}, "Pie", "arc"),
+                ('arc_no_field', {'field': 'theta'}, "Pie", "arc")]},
+        ]},
+    'correlate': {
+        'quotas': {'point': 1, 'point_three': 1},
+        'branches': [
+            {'when': {'arity': 2}, 'judge': ('point', 6), 'slots': [
+                ('point', {}, "Scatter", "point")]},
+            {'when': {'arity': 3}, 'judge': ('point', 6), 'slots': [
+                ('point_three', {}, "Grouping Scatter", "point")]},
+        ]},
+    'determine_range': {
+        'quotas': {'boxplot_1': 2, 'boxplot_2': 2},
+        'branches': [
+            {'when': {'mark': 'boxplot'}, 'judge': ('boxplot', 5), 'judge_first': True, 'slots': [
+                ('boxplot_1', {'arity': 1}, "Box Plot", "boxplot"),
+                ('boxplot_2', {'arity': 2}, "Box Plot", "boxplot")]},
+        ]},
+    'deviation': {
+        'quotas': {'bar': 2, 'point': 2},
+        'branches': [
+            {'when': {'mark': 'bar'}, 'judge': ('bar', 3), 'slots': [
+                ('bar', {}, "bar", "bar")]},
+            {'when': {'mark': 'point'}, 'judge': ('point', 3), 'slots': [
+                ('point', {}, "Scatter", "point")]},
+        ]},
+}
+
+# 为 True 时把配额与字段复用上限作为约束交给求解器 (asps/task.lp), 填满配额即停止枚举;
+# 求解器按枚举顺序而非代价顺序填配额 (不与 cost.lp 的优化同时使用), 选出的图表可能与默认的全量枚举、
+# 按代价排序后挑选不同; judge_first 分支中没有取得槽位的图表在 select_charts 中仍计入字段复用次数, 求解端不计
+SOLVER_QUOTAS = False
+# 求解端看不到 spec 是否分层, 分层条件按热力图的 mark 近似
+LAYER_MARK = 'rect'
+
+
+def quota_conditions(slot, cond):
+    """槽位条件对应的 slot_* 事实; 通道使用 Vega-Lite 中的名称, arc 的 theta/color 由 task.lp 从 x/y 换算"""
+    facts = []
+    if 'layer' in cond and 'mark' not in cond:
+        facts.append('slot_%s(%s,%s).' % ('mark' if cond['layer'] else 'not_mark', slot, LAYER_MARK))
+    if 'mark' in cond:
+        facts.append('slot_mark(%s,%s).' % (slot, cond['mark']))
+    if 'arity' in cond:
+        facts.append('slot_arity(%s,%d).' % (slot, cond['arity']))
+    for name in ('channel', 'field', 'no_field'):
+        if name in cond:
+            facts.append('slot_%s(%s,%s).' % (name, slot, cond[name]))
+    return facts
+
+
+def quota_spec(task):
+    """把任务的配额表翻译为 ASP 事实及求解端的配额计数, 供 run(quota=...) 使用;
+    求解端按枚举顺序而非代价从低到高填配额 (见 SOLVER_QUOTAS)"""
+    table = CHART_QUOTAS[task]
+    facts = []
+    slots = []
+    groups = {}
+    for branch in table['branches']:
+        judge = branch.get('judge')
+        if judge is not None:
+            groups[judge[0]] = judge[1]
+        for slot, cond, _, _ in branch['slots']:
+            facts.append('quota_slot(%s).' % slot)
+            facts.extend(quota_conditions(slot, dict(branch['when'], **cond)))
+            if judge is not None:
+                facts.append('slot_group(%s,%s).' % (slot, judge[0]))
+            slots.append((slot, None if judge is None else judge[0]))
+    return {'facts': facts, 'slots': slots, 'quotas': dict(table['quotas']), 'groups': groups}
+
+
+def solver_quota(task):
+    return quota_spec(task) if SOLVER_QUOTAS else None
+
+
+def chart_signature(vega):
+    """候选图表的 (是否分层, mark, 编码数, 编码通道, 带字段的通道) 与字段列表; 分层图表取第一层"""
+    layered = 'layer' in vega
+    spec = vega['layer'][0] if layered else vega
+    mark = spec.get('mark')
+    if isinstance(mark, dict):
+        mark = mark.get('type')
+    encoding = spec['encoding']
+    field_channels = [channel for channel in encoding if 'field' in encoding[channel]]
+    field_list = [encoding[channel]['field'] for channel in field_channels]
+    return (layered, mark, len(encoding), frozenset(encoding), frozenset(field_channels)), field_list
+
+
+def match_condition(cond, signature):
+    layered, mark, arity, channels, field_channels = signature
+    return (cond.get('layer', layered) == layered
+            and cond.get('mark', mark) == mark
+            and cond.get('arity', arity) == arity
+            and cond.get('channel', None) in channels | {None}
+            and cond.get('field', None) in field_channels | {None}
+            and ('no_field' not in cond or cond['no_field'] not in field_channels))
+
+
+def select_charts(recos, task):
+    """按 CHART_QUOTAS 中该任务的配额表单遍挑选图表, 所有配额用完即停止"""
+    table = CHART_QUOTAS[task]
+    max_counts = dict(table['quotas'])
+    branches = table['branches']
+    if recos is None:
+        return []
+    ans = []
+    judge_dicts = {}
+    # 同一 (mark, 编码数, 通道) 组合命中的分支与槽位只计算一次
+    index = {}
+    remaining = sum(max_counts.values())
+    for reco in recos:
+        if remaining <= 0:
+            break
+        vega = reco.props
+        signature, field_list = chart_signature(vega)
+        if signature not in index:
+            index[signature] = None
+            for branch in branches:
+                if match_condition(branch['when'], signature):
+                    slots = [slot for slot in branch['slots'] if match_condition(slot[1], signature)]
+                    index[signature] = (branch, slots)
+                    break
+        if index[signature] is None:
+            continue
+        branch, slots = index[signature]
+        if all(max_counts.get(slot[0], 0) <= 0 for slot in branch['slots']):
+            # 分支的配额已全部用完, 其字段计数不再影响结果
+            continue
+        judge = branch.get('judge')
+        if judge is not None:
+            field_dict = judge_dicts.setdefault(judge[0], {})
+        if judge is not None and branch.get('judge_first', False) \
+                and not judgement_field(field_dict, field_list, judge[1]):
+            continue
+        slot = next((slot for slot in slots if max_counts.get(slot[0], 0) > 0), None)
+        if slot is None:
+            continue
+        if judge is not None and not branch.get('judge_first', False) \
+                and not judgement_field(field_dict, field_list, judge[1]):
+            continue
+        max_counts[slot[0]] -= 1
+        remaining -= 1
+        ans.append({"chart_type": slot[2], "mark": slot[3], "vega-lite": vega})
+    print(max_counts)
+    return ans
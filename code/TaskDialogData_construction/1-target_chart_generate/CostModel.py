@@ -0,0 +1,123 @@
+import json
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+# 编辑操作表所在目录 (EditCostSolver.py 的输出), 不依赖当前工作目录
+EDIT_COST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lp')
+# 计入变换代价的编码属性 (与 EditFunc.TransformEditCost 一致)
+TRANSFORMS = ('aggregate', 'bin', 'sort', 'stack', 'loess', 'regression')
+# 计入 ADD_<通道> 代价的通道 (与 EditFunc.EncodingEditCost 一致)
+ENCODINGS = ('x', 'y', 'color', 'size', 'shape', 'latitude', 'longitude', 'theta')
+# 编辑操作表中不属于任务的分组
+OP_GROUPS = ('markEditOps', 'transformEditOps', 'encodingEditOps')
+
+
+def load_edit_costs(directory: str = EDIT_COST_DIR) -> Dict[str, Dict[str, dict]]:
+    """读取 lp/ 下的编辑操作表, 结构与 editOpSet 相同;
+    任务与标记的代价 (如 retrieve_value__rect) 取自 idMap.json 与 costs.json, 按任务分组"""
+    with open(os.path.join(directory, 'editOpSet.json'), 'r', encoding='UTF-8') as f:
+        op_set = json.load(f)
+    with open(os.path.join(directory, 'idMap.json'), 'r', encoding='UTF-8') as f:
+        id_map = json.load(f)
+    with open(os.path.join(directory, 'costs.json'), 'r', encoding='UTF-8') as f:
+        costs = json.load(f)
+    for name, index in id_map.items():
+        if '__' in name:
+            task = name.split('__', 1)[0]
+            op_set.setdefault(task, {})[name] = {'name': name, 'cost': costs[index]}
+    return op_set
+
+
+class CostModel:
+    """编译后的编辑操作代价表: 操作名在构造时解析为整数下标, 打分时只查表, 不复制 spec"""
+
+    __slots__ = ("names", "costs", "marks", "transforms", "channels")
+
+    def __init__(self, op_set: Dict[str, Dict[str, dict]]):
+        self.names: List[str] = []
+        self.costs: List[float] = []
+        # (任务, 标记) -> 下标
+        self.marks: Dict[Tuple[str, str], int] = {}
+        # (变换属性, 取值) -> 下标; 只有聚合与堆叠区分取值, 其余属性的取值为 None
+        self.transforms: Dict[Tuple[str, Optional[str]], int] = {}
+        # 通道 -> 下标
+        self.channels: Dict[str, int] = {}
+        for group, ops in op_set.items():
+            for name, op in ops.items():
+                index = len(self.costs)
+                self.names.append(name)
+                self.costs.append(op['cost'])
+                if group == 'transformEditOps':
+                    head, _, value = name.partition('_')
+                    if head in ('AGGREGATE', 'STACK'):
+                        self.transforms[head.lower(), value] = index
+                    elif name.lower() in TRANSFORMS:
+                        self.transforms[name.lower(), None] = index
+                elif group == 'encodingEditOps':
+                    if name.startswith('ADD_') and name[4:].lower() in ENCODINGS:
+                        self.channels[name[4:].lower()] = index
+                elif group not in OP_GROUPS and name.startswith(group + '__'):
+                    self.marks[group, name[len(group) + 2:]] = index
+
+    def transform_index(self, t: str, value) -> Optional[int]:
+        if t == 'aggregate' or t == 'stack':
+            return self.transforms.get((t, str(value).upper()))
+        return self.transforms.get((t, None))
+
+    def score(self, dd: dict, task: Optional[str] = None) -> Tuple[float, Set[str]]:
+        """单个 Vega-Lite spec 的代价与字段, 与 EditFunc.GetCost 结果一致"""
+        costs = self.costs
+        layers = dd['layer']
+        cost = 0
+        if task is not None:
+            index = self.marks.get((task, layers[0]['mark']['type']))
+            if index is not None:
+                cost += costs[index]
+        d = {}
+        for encode in layers:
+            d.update(encode['encoding'])
+        for item in layers:
+            if 'transform' in item:
+                d['transform'] = item['transform'][0]
+
+        Match = set()
+        Tcost = 0
+        for c, props in d.items():
+            for t, value in props.items():
+                if t in TRANSFORMS:
+                    index = self.transform_index(t, value)
+                    if index is not None:
+                        Tcost += costs[index]
+                elif t == 'field':
+                    Match.add(value)
+        if layers[0]['mark']['type'] == 'geoshape':
+            try:
+                index = self.transform_index('aggregate', layers[0]['transform'][1]['window'][0]['op'])
+            except (KeyError, IndexError, TypeError):
+                index = None
+            if index is not None:
+                Tcost += costs[index]
+            Match = set(item.split()[2] if item.startswith("mean of ") or item.startswith("sum of ") else item
+                        for item in Match)
+        cost += Tcost
+
+        Ecost = 0
+        for c in d:
+            index = self.channels.get(c)
+            if index is not None:
+                Ecost += costs[index]
+        cost += Ecost
+        return cost, Match
+
+    def score_many(self, specs: List[dict], task: Optional[str] = None):
+        """一次为一组候选 spec 打分, 返回 (代价数组, 各 spec 的字段集合)"""
+        import numpy as np
+
+        score = self.score
+        scores = []
+        fields = []
+        for dd in specs:
+            cost, Match = score(dd, task)
+            scores.append(cost)
+            fields.append(Match)
+        return np.array(scores, dtype=np.float64), fields
@@ -0,0 +1,123 @@
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# 每个进程最多保留的数据集画像数量; result.py 按数据集顺序调度, 少量即可覆盖
+MAX_PROFILES = 4
+
+
+def ColumnTypeDict(columns, ColumnTypes: List[dict] = ()) -> Dict[str, str]:
+    """把 [{'field', 'type'}] 形式的列描述整理为 {field: type}, 缺失类型记为 unknown"""
+    ColumnDict = {}
+    if len(ColumnTypes) == 0:
+        for key in list(columns):
+            ColumnDict[key] = 'unknown'
+    elif len(ColumnTypes[0]) == 1:
+        for item in ColumnTypes:
+            ColumnDict[item['field']] = 'unknown'
+    else:
+        for item in ColumnTypes:
+            ColumnDict[item['field']] = item['type']
+    return ColumnDict
+
+
+class DatasetProfile:
+    """单个数据集的列类型、ASP 数据事实和查询 spec, 只计算一次并在所有任务间共享"""
+
+    __slots__ = ("path", "mtime", "num_rows", "column_types", "data_asp", "query", "_data", "_rows", "_arrow")
+
+    def __init__(self, Data, ColumnTypes: List[dict] = (), DataAsp: Optional[List[str]] = None,
+                 path: Optional[str] = None, mtime: Optional[int] = None):
+        import pandas as pd
+        from helper import data_to_asp
+        from Transform import GetNewColumnType
+
+        if type(Data) is list:
+            Data = pd.DataFrame(Data)
+        elif type(Data) is not pd.DataFrame:
+            raise Exception(print("Data invaild."))
+        ColumnDict = ColumnTypeDict(Data.columns, ColumnTypes)
+        Data = Data[list(ColumnDict.keys())]
+        column_types = GetNewColumnType(Data, ColumnDict)
+        if DataAsp is None:
+            DataAsp = data_to_asp(Data, column_types)
+        self.setup(path, mtime, len(Data), column_types, DataAsp)
+        self._data = Data
+
+    @classmethod
+    def from_csv(cls, path: str, ColumnTypes: List[dict] = (), mtime: Optional[int] = None) -> "DatasetProfile":
+        import pandas as pd
+
+        return cls(pd.read_csv(path), ColumnTypes, path=path, mtime=mtime)
+
+    def setup(self, path, mtime, num_rows, column_types, DataAsp):
+        from Transform import Cql2Asp
+
+        self.path = path
+        self.mtime = mtime
+        self.num_rows = num_rows
+        self.column_types = column_types
+        self.data_asp = DataAsp
+        query_spec = {'data': {'url': "./values"}, 'encodings': []}
+        for field, type_ in column_types.items():
+            query_spec['encodings'].append({"field": field, "type": type_})
+        self.query = Cql2Asp(query_spec)
+        self._rows = None
+        self._arrow = None
+
+    @property
+    def program(self) -> List[str]:
+        """交给求解器的完整程序: 查询 spec 加数据事实"""
+        return self.query + self.data_asp
+
+    @property
+    def data(self):
+        """数据集本身 (只保留列类型中的列)"""
+        return self._data
+
+    @property
+    def rows(self) -> List[dict]:
+        """TaskAPIs 返回的逐行数据 (与原实现相同, 经 where(notnull, None) 处理缺失值), 首次访问时生成"""
+        if self._rows is None:
+            import pandas as pd
+
+            df = self.data.where((pd.notnull(self.data)), None)
+            self._rows = list(df.T.to_dict().values())
+        return self._rows
+
+    @property
+    def arrow(self):
+        """数据集的 Arrow 表, 首次访问时生成; 数值列按整块缓冲区转换, 字符串等 object 列仍逐个单元格转换"""
+        if self._arrow is None:
+            import pyarrow as pa
+
+            self._arrow = pa.Table.from_pandas(self.data, preserve_index=False)
+        return self._arrow
+
+    def records(self, Rows: Optional[str] = "dict"):
+        """按 Rows 返回逐行数据: "dict" 为 rows, "arrow" 为 Arrow 表, None 不返回数据"""
+        if Rows is None:
+            return None
+        if Rows == "dict":
+            return self.rows
+        if Rows == "arrow":
+            return self.arrow
+        raise ValueError("No %s row mode!" % Rows)
+
+
+profiles = OrderedDict()
+
+
+def load_profile(path: str, ColumnTypes: List[dict] = ()) -> DatasetProfile:
+    """按文件路径与修改时间缓存数据集画像, 文件被改写后自动重新计算"""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    key = (path, tuple((item['field'], item.get('type')) for item in ColumnTypes))
+    profile = profiles.get(key)
+    if profile is None or profile.mtime != mtime:
+        profile = DatasetProfile.from_csv(path, ColumnTypes, mtime=mtime)
+        profiles[key] = profile
+        while len(profiles) > MAX_PROFILES:
+            profiles.popitem(last=False)
+    profiles.move_to_end(key)
+    return profile
@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+from typing import Dict, List, Tuple
+
+# 规则集与生成结果所在目录 (与 lp/lp.js、lp/genEditOpSet.js 相同), 不依赖当前工作目录
+EDIT_COST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lp')
+RULE_SET = 'ruleSet.json'
+# 每条不等式两侧至少相差的代价, 也是所有代价的下界
+MIN_COST = 0.01
+# 编码代价上限为最大编码代价乘以该深度 (与 genEditOpSet.js 一致)
+DEPTH = 10
+# 求解结果按规则集内容的哈希缓存, 规则不变时不再求解; 设为 None 可关闭
+CACHE_DIR = '.edit_cost_cache'
+# 求解方式的版本, 改变目标函数或取整方式时加一, 使旧缓存失效
+SOLVER_VERSION = 2
+# 第一阶段最优总代价的相对容差
+SUM_TOLERANCE = 1e-9
+# 规则集名称与 editOpSet 分组的对应关系; 各任务的 task__mark 操作不在 editOpSet 中 (见 CostModel.load_edit_costs)
+OP_GROUPS = {'marktype': 'markEditOps', 'transform': 'transformEditOps', 'encoding': 'encodingEditOps'}
+
+
+def load_rule_set(path: str = os.path.join(EDIT_COST_DIR, RULE_SET)) -> List[dict]:
+    with open(path, 'r', encoding='UTF-8') as f:
+        return json.load(f)
+
+
+def extract_actions(rule_set: List[dict]) -> Tuple[List[str], Dict[str, int]]:
+    """按规则集顺序列出全部编辑操作, 并给出操作名到编号的映射 (即 idMap.json)"""
+    actions = []
+    id_map = {}
+    for rs in rule_set:
+        for action in rs['actions']:
+            if action not in id_map:
+                id_map[action] = len(actions)
+                actions.append(action)
+    return actions, id_map
+
+
+def linear_program(rule_set: List[dict], mincost: float = MIN_COST):
+    """与 lp.js 的 linearProgram 相同: 返回 A x <= b 形式的约束 (A, b) 与编辑操作列表;
+    规则链中相邻的两项满足 前者 + mincost <= 后者, 高优先级规则集中的每个操作大于低一级规则集的代价之和"""
+    actions, id_map = extract_actions(rule_set)
+    n = len(actions)
+    A = []
+    b = []
+
+    def constraint(lower: Dict[int, float], upper: int):
+        row = [0.0] * n
+        for i, v in lower.items():
+            row[i] = v
+        row[upper] = -1.0
+        A.append(row)
+        b.append(-mincost)
+
+    for k, rs in enumerate(rule_set):
+        if k > 0:
+            lower = {id_map[a]: 1.0 for a in rule_set[k - 1]['actions']}
+            for action in rs['actions']:
+                constraint(lower, id_map[action])
+        for rule in rs['rules']:
+            u = rule[0] if isinstance(rule[0], list) else [rule[0]]
+            for item in rule[1:]:
+                v = item if isinstance(item, list) else [item]
+                for i in u:
+                    for j in v:
+                        constraint({id_map[i]: 1.0}, id_map[j])
+                u = v
+    return A, b, actions, id_map
+
+
+def rule_hash(rule_set: List[dict], mincost: float = MIN_COST) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps(rule_set, sort_keys=True, separators=(',', ':')).encode('utf8'))
+    h.update(repr(mincost).encode('utf8'))
+    h.update(repr(SOLVER_VERSION).encode('utf8'))
+    return h.hexdigest()
+
+
+def solve_costs(rule_set: List[dict], mincost: float = MIN_COST, cache_dir=CACHE_DIR) -> Tuple[List[float], Dict[str, int]]:
+    """以 HiGHS 求解 min sum(x), A x <= b, x >= mincost; 总代价相同的解有多个, 第二阶段固定总代价,
+    再最小化 sum((i + 1) * x_i) (靠前的操作尽量便宜), 使结果唯一。代价按 mincost 的精度取整;
+    返回 (costs, idMap), 相同规则集直接读取缓存"""
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, rule_hash(rule_set, mincost) + '.json')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='UTF-8') as f:
+                cached = json.load(f)
+            return cached['costs'], cached['idMap']
+    import numpy as np
+    from scipy.optimize import linprog
+
+    A, b, actions, id_map = linear_program(rule_set, mincost)
+    n = len(actions)
+    A = np.array(A)
+    b = np.array(b)
+    bounds = [(mincost, None)] * n
+    result = linprog(np.ones(n), A_ub=A, b_ub=b, bounds=bounds, method='highs')
+    if result.status != 0:
+        raise ValueError("Edit-cost LP is not solvable: %s" % result.message)
+    total = result.fun + SUM_TOLERANCE * max(1.0, abs(result.fun))
+    result = linprog(np.arange(1, n + 1, dtype=float), A_ub=np.vstack([A, np.ones(n)]), b_ub=np.append(b, total),
+                     bounds=bounds, method='highs')
+    if result.status != 0:
+        raise ValueError("Edit-cost tie-break LP is not solvable: %s" % result.message)
+    digits = max(0, -math.floor(math.log10(mincost)))
+    costs = [round(float(x), digits) for x in result.x]
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump({'costs': costs, 'idMap': id_map}, f)
+    return costs, id_map
+
+
+def edit_op_set(rule_set: List[dict], costs: List[float], id_map: Dict[str, int], depth: int = DEPTH) -> Dict[str, dict]:
+    """按规则集把代价整理为 editOpSet 结构: 标记、变换、编码三组, 编码组附带 ceiling (与 genEditOpSet.js 相同)"""
+    op_set = {group: {} for group in OP_GROUPS.values()}
+    for rs in rule_set:
+        if rs['name'] not in OP_GROUPS:
+            continue
+        group = op_set[OP_GROUPS[rs['name']]]
+        for action in rs['actions']:
+            group[action] = {'name': action, 'cost': costs[id_map[action]]}
+    max_encoding_cost = max((op['cost'] for op in op_set['encodingEditOps'].values()), default=0)
+    op_set['encodingEditOps']['ceiling'] = {
+        'cost': max_encoding_cost * depth,
+        'alternatingCost': max_encoding_cost * (depth + 1)
+    }
+    return op_set
+
+
+def write_json(path: str, value):
+    with open(path, 'w', encoding='UTF-8') as f:
+        json.dump(value, f, indent=4, ensure_ascii=False)
+        f.write('\n')
+
+
+def main(directory: str = EDIT_COST_DIR, mincost: float = MIN_COST, depth: int = DEPTH, cache_dir=CACHE_DIR):
+    """读取 ruleSet.json, 写出 idMap.json、costs.json 与 editOpSet.json"""
+    rule_set = load_rule_set(os.path.join(directory, RULE_SET))
+    costs, id_map = solve_costs(rule_set, mincost, cache_dir)
+    write_json(os.path.join(directory, 'idMap.json'), id_map)
+    write_json(os.path.join(directory, 'costs.json'), costs)
+    write_json(os.path.join(directory, 'editOpSet.json'), edit_op_set(rule_set, costs, id_map, depth))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solve the edit-operation cost LP and regenerate lp/editOpSet.json.")
+    parser.add_argument('--dir', default=EDIT_COST_DIR, help="directory holding ruleSet.json and the generated files")
+    parser.add_argument('--mincost', type=float, default=MIN_COST, help="minimum gap between ordered costs")
+    parser.add_argument('--depth', type=int, default=DEPTH, help="encoding ceiling depth")
+    parser.add_argument('--no-cache', action='store_true', help="always solve the LP")
+    args = parser.parse_args()
+    main(args.dir, args.mincost, args.depth, None if args.no_cache else CACHE_DIR)
@@ -1,6 +1,12 @@
-from copy import deepcopy
-import queue
-from getEditOpSet import editOpSet
+from copy import copy
+from types import SimpleNamespace
+import heapq
+import json
+from CostModel import CostModel, load_edit_costs
+
+# 编辑操作表只从 lp/ 读取一次, 编译后 GetCost/GetCosts 与 RunClingo.cost_facts 按整数下标查表
+editOpSet = load_edit_costs()
+cost_model = CostModel(editOpSet)
 
 def MarkEditOps(s, d,task=None):
     editOps = []
@@ -27,7 +33,7 @@ def MarkEditOps(s, d,task=None):
 def TransformEditOps(ss, dd):
     editOps = []
 
-    ts = deepcopy(ss)['layer']
+    ts = ss['layer']
     s={}
     for encode in ts:
         s.update(encode['encoding'])
@@ -35,7 +41,7 @@ def TransformEditOps(ss, dd):
         if 'transform' in item.keys():
             s['transform']=item['transform'][0]
     
-    td = deepcopy(dd)['layer']
+    td = dd['layer']
     d={}
     for encode in td:
         d.update(encode['encoding'])
@@ -89,10 +95,11 @@ def TransformEditOps(ss, dd):
 
 
 def RemoveTransform(result_):
-    result = deepcopy(result_)
-    result.props = result.props['layer']
+    # 只读取原 spec: 新建通道映射, 没有字段的通道直接引用原编码, 不复制整个 spec
+    result = copy(result_)
+    result.Ops = list(result_.Ops)
     d={}
-    for encode in result.props:
+    for encode in result_.props['layer']:
         d.update(encode['encoding'])
     # for item in result.props:
     #     if 'transform' in item.keys():
@@ -152,91 +159,151 @@ def GetGraphPara(s, d):
     return GraphPara
 
 
+class EditState:
+    """EncodingEditOps 的搜索状态: 通道映射只做浅拷贝, 各通道的取值在状态间共享且不被修改;
+    编辑操作以父指针链记录, 每个状态只保存自己新增的一步"""
+    __slots__ = ("props", "cost", "parent", "op")
+
+    def __init__(self, props, cost=0, parent=None, op=None):
+        self.props = props
+        self.cost = cost
+        self.parent = parent
+        self.op = op
+
+    def step(self, props, op):
+        return EditState(props, self.cost + op['cost'], self, op)
+
+    @property
+    def Ops(self):
+        ops = []
+        state = self
+        while state.op is not None:
+            ops.append(state.op)
+            state = state.parent
+        ops.reverse()
+        return ops
+
+
 def EncodingEditOps(start, destination):
+    """以 GetInitCost 的直接改写代价为上界, 用 A* 搜索最小代价的编码编辑序列;
+    相同的通道映射只展开一次, 启发式取必需的填入/改正代价之和与移除代价之和中的较大者,
+    每个编辑操作至多填入、改正或移走一个通道, 因此不会高估剩余代价"""
     s = RemoveTransform(start)
     d = RemoveTransform(destination)
-    dkeys = list(d.props.keys())
+    ops = editOpSet['encodingEditOps']
     mincost = GetInitCost(s.props, d.props)
-    EditOps = []
-    # visited = []
-    q = queue.Queue()
-    q.put(s)
-    # visited.append(s.props)
-    # PriorityPara = {'ADD': 4, 'REMOVE': 3, 'MODIFY': 3, 'MOVE_be': 2, 'MOVE_af': 2}
-    while not q.empty():
-        u = q.get()
-        # print("-----------------")
-        # print(q.qsize())
-        # print(u.props)
-        # print(u.Ops)
-        if u.cost > mincost:
-            continue
-        if u.props == d.props:
-            if u.cost < mincost:
-                mincost = u.cost
-                EditOps = u.Ops
-            elif u.cost == mincost:
-                EditOps = u.Ops
+    inf = float('inf')
+
+    # 通道取值只来自 s 与 d, 相同的取值映射为同一个正整数 (0 表示通道为空);
+    # 状态是按通道排列的整数元组, 本身即可作为已访问表的键
+    tokens = {}
+    for v in list(s.props.values()) + list(d.props.values()):
+        tokens.setdefault(json.dumps(v, sort_keys=True, default=str), len(tokens) + 1)
+    channels = list(dict.fromkeys(list(s.props) + list(d.props)))
+    slots = range(len(channels))
+    state = tuple(tokens[json.dumps(s.props[c], sort_keys=True, default=str)] if c in s.props else 0
+                  for c in channels)
+    goal = tuple(tokens[json.dumps(d.props[c], sort_keys=True, default=str)] if c in d.props else 0
+                 for c in channels)
+    names = [c.upper() for c in channels]
+    add = [ops.get('ADD_'+name) for name in names]
+    modify = [ops.get('MODIFY_'+name) for name in names]
+    remove = [ops.get('REMOVE_'+name) for name in names]
+    move = [[ops.get('MOVE_'+a+'_'+b) if i != j and goal[j] else None for j, b in enumerate(names)]
+            for i, a in enumerate(names)]
+
+    def cost(op):
+        return inf if op is None else op['cost']
+
+    # 取值只能由 ADD/MODIFY 写成目标值或由 MOVE 搬动, 因此 MOVE 到通道 j 的前提是 goal[j] 出现在
+    # 初始状态或其他目标通道中; 多余通道不会被写入, 其取值始终是初始值
+    fill = [min([cost(add[j])] + [cost(move[i][j]) for i in slots
+                                  if state[i] == goal[j] or (i != j and goal[i] == goal[j])])
+            if goal[j] else 0 for j in slots]
+    clear = [min([cost(remove[i])] + [cost(move[i][j]) for j in slots if goal[j] == state[i]])
+             if state[i] and not goal[i] else 0 for i in slots]
+
+    # 每个通道在各取值下对启发式的贡献: need 计目标通道的填入/改正与只能 REMOVE 的多余通道, extra 计多余通道的移走;
+    # 取值错误的通道只能 MODIFY, 或在其取值恰是另一目标通道的取值时先 MOVE 出去再重新填入
+    need = []
+    extra = []
+    for i in slots:
+        row_need = [0] * (len(tokens) + 1)
+        row_extra = [0] * (len(tokens) + 1)
+        for v in range(len(tokens) + 1):
+            if goal[i]:
+                if v == 0:
+                    row_need[v] = fill[i]
+                elif v != goal[i]:
+                    refill = fill[i] if any(goal[j] == v for j in slots if j != i) else inf
+                    row_need[v] = min(cost(modify[i]), refill)
+            elif v:
+                row_extra[v] = clear[i]
+                # 不能 MOVE 出去的多余通道只能 REMOVE, 这一步与填入/改正的操作互不重叠, 可以累加
+                if not any(cost(move[i][j]) < inf and goal[j] == v for j in slots):
+                    row_need[v] = clear[i]
+        need.append(row_need)
+        extra.append(row_extra)
+
+    hn = sum(need[i][state[i]] for i in slots)
+    he = sum(extra[i][state[i]] for i in slots)
+    if hn == inf or he == inf:
+        return []
+    root = EditState(state, s.cost)
+    best = {state: root.cost}
+    counter = 0
+    # f 相同时优先展开已走得更远的状态
+    heap = [(root.cost + max(hn, he), -root.cost, counter, root, hn, he)]
+    while heap:
+        f, _, _, u, hn, he = heapq.heappop(heap)
+        # 增量累加的启发式有浮点误差, 与上界比较时留出余量
+        if f > mincost + 1e-9:
+            break
+        t = u.props
+        if best[t] < u.cost:
             continue
-        GraphPara = GetGraphPara(u.props, d.props)
-        skeys = list(u.props.keys())
-        # print(GraphPara)
-        # print("skeys:",GraphPara["REMOVE"])
-        # print("dkeys:",GraphPara["ADD"])
-        for k, v in GraphPara.items():
-            if k == 'ADD':
-                for c in v:
-                    T = deepcopy(u)
-                    if not c in skeys:
-                        T.props[c] = d.props[c]
-                        # if not T.props in visited:
-                        # visited.append(T.props)
-                        editOpName = 'ADD_'+c.upper()
-                        if(editOpName in editOpSet['encodingEditOps']):
-                            T.cost += editOpSet['encodingEditOps'][editOpName]['cost']
-                            T.Ops.append(editOpSet['encodingEditOps'][editOpName])
-                            q.put(T)
-            elif k == 'REMOVE':
-                for c in v:
-                    T = deepcopy(u)
-                    if not c in dkeys:
-                        T.props.pop(c)
-                        # if not T.props in visited:
-                        # visited.append(T.props)
-                        editOpName = 'REMOVE_'+c.upper()
-                        if(editOpName in editOpSet['encodingEditOps']):
-                            T.cost += editOpSet['encodingEditOps'][editOpName]['cost']
-                            T.Ops.append(editOpSet['encodingEditOps'][editOpName])
-                            q.put(T)
-            elif k == 'MODIFY':
-                for c in v:
-                    T = deepcopy(u)
-                    if c in dkeys:
-                        T.props[c] = d.props[c]
-                        # if not T.props in visited:
-                        # visited.append(T.props)
-                        editOpName = 'MODIFY_'+c.upper()
-                        if(editOpName in editOpSet['encodingEditOps']):
-                            T.cost += editOpSet['encodingEditOps'][editOpName]['cost']
-                            T.Ops.append(editOpSet['encodingEditOps'][editOpName])
-                            q.put(T)
-            elif k == 'MOVE_be':
-                v_be = GraphPara['MOVE_be']
-                v_af = GraphPara['MOVE_af']
-                for c1 in v_be:
-                    for c2 in v_af:
-                        T = deepcopy(u)
-                        if c1 != c2 and T.props[c1] == d.props[c2] and not c2 in skeys:
-                            T.props[c2] = T.props.pop(c1)
-                            # if not T.props in visited:
-                            # visited.append(T.props)
-                            editOpName = 'MOVE_'+c1.upper()+'_'+c2.upper()
-                            if(editOpName in editOpSet['encodingEditOps']):
-                                T.cost += editOpSet['encodingEditOps'][editOpName]['cost']
-                                T.Ops.append(
-                                    editOpSet['encodingEditOps'][editOpName])
-                                q.put(T)
-    return EditOps
+        if t == goal:
+            return s.Ops + u.Ops
+        for i in slots:
+            v = t[i]
+            if goal[i]:
+                if v == 0:
+                    op = add[i]
+                elif v != goal[i]:
+                    op = modify[i]
+                else:
+                    op = None
+                if op is not None:
+                    changes = ((i, goal[i]),)
+                    counter = EncodingPush(heap, best, need, extra, u, t, changes, op, hn, he, counter)
+            if v == 0:
+                continue
+            if not goal[i] and remove[i] is not None:
+                counter = EncodingPush(heap, best, need, extra, u, t, ((i, 0),), remove[i], hn, he, counter)
+            for j in slots:
+                op = move[i][j]
+                if op is not None and t[j] == 0 and goal[j] == v:
+                    counter = EncodingPush(heap, best, need, extra, u, t, ((i, 0), (j, v)), op, hn, he, counter)
+    return []
+
+
+def EncodingPush(heap, best, need, extra, u, t, changes, op, hn, he, counter):
+    """把 u 经过 op 得到的状态放入堆中, 启发式按改动的通道增量更新; 返回新的计数器"""
+    props = list(t)
+    for i, v in changes:
+        hn += need[i][v] - need[i][t[i]]
+        he += extra[i][v] - extra[i][t[i]]
+        props[i] = v
+    if hn == float('inf') or he == float('inf'):
+        return counter
+    props = tuple(props)
+    cost = u.cost + op['cost']
+    if best.get(props, float('inf')) <= cost:
+        return counter
+    best[props] = cost
+    counter += 1
+    heapq.heappush(heap, (cost + max(hn, he), -cost, counter, u.step(props, op), hn, he))
+    return counter
 
 
 ### just get cost ###
@@ -251,7 +318,7 @@ def MarkEditCost(d,task=None):
 def TransformEditCost(dd):
     editOps=[]
     Match = set()
-    td = deepcopy(dd)['layer']
+    td = dd['layer']
     d={}
     for encode in td:
         d.update(encode['encoding'])
@@ -295,9 +362,23 @@ def TransformEditCost(dd):
         cost+=trans['cost']
     return cost,Match
 
+def GetFields(dd):
+    """只取出图表用到的字段, 与 TransformEditCost 返回的 Match 相同, 不计算代价"""
+    d={}
+    for encode in dd['layer']:
+        d.update(encode['encoding'])
+    for item in dd['layer']:
+        if 'transform' in item.keys():
+            d['transform']=item['transform'][0]
+    Match = set(d[c]['field'] for c in d if 'field' in d[c])
+    if dd['layer'][0]["mark"]["type"]=="geoshape":
+        Match = set(item.split()[2] if item.startswith("mean of ") or item.startswith("sum of ") else item
+                    for item in Match)
+    return Match
+
 def EncodingEditCost(dd):
     editOps=[]
-    td = deepcopy(dd)['layer']
+    td = dd['layer']
     d={}
     for encode in td:
         d.update(encode['encoding'])
@@ -315,9 +396,164 @@ def EncodingEditCost(dd):
     return cost
 
 def GetCost(destination,task=None):
-    cost = 0
-    cost+=MarkEditCost(destination,task)
-    Tcost,Match=TransformEditCost(destination)
-    cost+=Tcost
-    cost+=EncodingEditCost(destination)
-    return cost,Match
+    """MarkEditCost + TransformEditCost + EncodingEditCost, 由编译后的代价表直接读取 spec 计算"""
+    return cost_model.score(destination,task)
+
+def GetCosts(destinations,task=None):
+    """批量计算一组 spec 的代价, 返回 (代价数组, 字段集合列表)"""
+    return cost_model.score_many(destinations,task)
+
+
+### pairwise edit-cost matrix ###
+def ChartFeatures(specs):
+    """把一组 spec 特征化: 标记类型、各通道是否存在、通道字段编号 (按 RemoveTransform 的规则),
+    以及各 (通道, 变换) 是否存在与对应的变换代价"""
+    import numpy as np
+
+    transform = ['aggregate', 'bin', 'sort', 'stack', 'loess', 'regression']
+    merged = []
+    for dd in specs:
+        d = {}
+        for encode in dd['layer']:
+            d.update(encode['encoding'])
+        for item in dd['layer']:
+            if 'transform' in item.keys():
+                d['transform'] = item['transform'][0]
+        merged.append(d)
+    channels = list(dict.fromkeys(c for d in merged for c in d))
+    index = {c: k for k, c in enumerate(channels)}
+    N, C, T = len(specs), len(channels), len(transform)
+    present = np.zeros((N, C), dtype=bool)
+    fields = np.full((N, C), -1, dtype=np.int64)
+    tpresent = np.zeros((N, C, T), dtype=bool)
+    tcost = np.zeros((N, C, T), dtype=np.float64)
+    marks = []
+    tokens = {}
+    ops = editOpSet['transformEditOps']
+    for n, (dd, d) in enumerate(zip(specs, merged)):
+        marks.append(dd['layer'][0]['mark']['type'])
+        for c, props in d.items():
+            k = index[c]
+            if c != 'transform':
+                present[n, k] = True
+                if 'field' in props:
+                    value = props['field']
+                elif c == 'y' and 'field' in d.get('x', {}):
+                    value = d['x']['field']
+                else:
+                    value = json.dumps(props, sort_keys=True, default=str)
+                fields[n, k] = tokens.setdefault(value, len(tokens))
+            for j, t in enumerate(transform):
+                if t in props:
+                    editOpName = t.upper()
+                    if editOpName == 'AGGREGATE' or editOpName == 'STACK':
+                        editOpName = editOpName+'_'+str(props[t]).upper()
+                    tpresent[n, k, j] = True
+                    if editOpName in ops:
+                        tcost[n, k, j] = ops[editOpName]['cost']
+    return {'channels': channels, 'marks': marks, 'present': present, 'fields': fields,
+            'tpresent': tpresent, 'tcost': tcost}
+
+
+def MarkTransformCostMatrix(s, d, task=None):
+    """特征化后两组 spec 之间的标记与变换编辑代价 (与 MarkEditOps、TransformEditOps 一致)"""
+    import numpy as np
+
+    # 标记: 两两查表; 与 MarkEditOps 相同, 不给定任务时不计标记代价, 起点无标记时按 task__mark 计
+    names = list(dict.fromkeys(s['marks'] + d['marks']))
+    table = np.zeros((len(names), len(names)))
+    if task is not None:
+        for a, ma in enumerate(names):
+            for b, mb in enumerate(names):
+                if ma == mb:
+                    continue
+                if ma == '':
+                    editOpName = task+'__'+mb
+                    if editOpName in editOpSet[task]:
+                        table[a, b] = editOpSet[task][editOpName]['cost']
+                else:
+                    editOpName = "_".join(sorted([ma.upper(), mb.upper()]))
+                    if editOpName in editOpSet['markEditOps']:
+                        table[a, b] = editOpSet['markEditOps'][editOpName]['cost']
+    mark_index = {m: k for k, m in enumerate(names)}
+    si = np.array([mark_index[m] for m in s['marks']], dtype=np.intp)
+    di = np.array([mark_index[m] for m in d['marks']], dtype=np.intp)
+    cost = table[si[:, None], di[None, :]]
+
+    # 变换: 只在一侧出现的 (通道, 变换) 计该侧的变换代价
+    sp = s['tpresent'].reshape(len(s['marks']), -1)
+    dp = d['tpresent'].reshape(len(d['marks']), -1)
+    sw = s['tcost'].reshape(len(s['marks']), -1)
+    dw = d['tcost'].reshape(len(d['marks']), -1)
+    cost += (sw * sp) @ (~dp).T + (~sp) @ (dw * dp).T
+    return cost
+
+
+def SplitFeatures(specs, others):
+    """两组 spec 一起特征化, 使通道列表与字段编号一致; 返回 (通道列表, specs 的特征, others 的特征)"""
+    features = ChartFeatures(list(specs) + list(others))
+    N = len(specs)
+    s = {k: v[:N] for k, v in features.items() if k != 'channels'}
+    d = {k: v[N:] for k, v in features.items() if k != 'channels'}
+    return features['channels'], s, d
+
+
+def UniqueEncodings(specs):
+    """按 EncodingEditOps 实际读取的部分 (RemoveTransform 后的通道映射) 给 spec 去重;
+    返回 (各组的代表 spec, 每个 spec 所属组的下标)"""
+    import numpy as np
+
+    groups = {}
+    unique = []
+    index = []
+    for dd in specs:
+        key = json.dumps(RemoveTransform(SimpleNamespace(props=dd, cost=0, Ops=[])).props, default=str)
+        if key not in groups:
+            groups[key] = len(unique)
+            unique.append(dd)
+        index.append(groups[key])
+    return unique, np.array(index, dtype=np.intp)
+
+
+def EditCostMatrix(specs, others=None, task=None):
+    """一组 spec 两两之间 (或与 others 之间) 的编辑代价矩阵 (NumPy 数组, N×N 或 N×M);
+    第 (a, b) 项等于 MarkEditOps(a, b, task)、TransformEditOps(a, b) 与 EncodingEditOps(a, b) 的代价之和,
+    编码部分按通道映射去重, 每个不同的 (行, 列) 组合只调用一次 EncodingEditOps, 再广播到整个矩阵"""
+    import numpy as np
+
+    specs = list(specs)
+    same = others is None
+    others = specs if same else list(others)
+    channels, s, d = SplitFeatures(specs, others)
+    cost = MarkTransformCostMatrix(s, d, task)
+    rows, row_index = UniqueEncodings(specs)
+    cols, col_index = (rows, row_index) if same else UniqueEncodings(others)
+    encoding = np.zeros((len(rows), len(cols)))
+    for a, x in enumerate(rows):
+        for b, y in enumerate(cols):
+            editOps = EncodingEditOps(SimpleNamespace(props=x, cost=0, Ops=[]),
+                                      SimpleNamespace(props=y, cost=0, Ops=[]))
+            encoding[a, b] = sum(op['cost'] for op in editOps)
+    cost += encoding[row_index[:, None], col_index[None, :]]
+    return cost
+
+
+def ApproxEditCostMatrix(specs, others=None, task=None):
+    """EditCostMatrix 的向量化近似: 标记与变换部分相同, 编码部分只按通道计直接改写的代价
+    (字段不同 MODIFY、多出 REMOVE、缺少 ADD), 不考虑 MOVE 与 SWAP, 因此不小于 EditCostMatrix 的对应项"""
+    import numpy as np
+
+    specs = list(specs)
+    others = specs if others is None else list(others)
+    channels, s, d = SplitFeatures(specs, others)
+    cost = MarkTransformCostMatrix(s, d, task)
+    ops = editOpSet['encodingEditOps']
+    names = [c.upper() for c in channels]
+    add = np.array([ops.get('ADD_'+c, {'cost': 0})['cost'] for c in names])
+    remove = np.array([ops.get('REMOVE_'+c, {'cost': 0})['cost'] for c in names])
+    modify = np.array([ops.get('MODIFY_'+c, {'cost': 0})['cost'] for c in names])
+    sp, dp = s['present'].astype(np.float64), d['present'].astype(np.float64)
+    cost += (sp * remove) @ (1 - dp).T + (1 - sp) @ (dp * add).T
+    changed = (s['fields'][:, None, :] != d['fields'][None, :, :]) & s['present'][:, None, :] & d['present'][None, :, :]
+    cost += changed @ modify
+    return cost
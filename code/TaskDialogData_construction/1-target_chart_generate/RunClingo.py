@@ -1,15 +1,19 @@
-from typing import Dict, List, Optional
-import clyngor
-from clyngor.answers import Answers
-from Transform import Asp2Vl
+from typing import TYPE_CHECKING, Dict, List, Optional
+import clingo
+import clingo.ast
+from AnswerCache import AnswerCache
 import logging
 import subprocess
 import os
 import tempfile
 import json
 from time import time
+from collections import deque
 import threading
 
+if TYPE_CHECKING:
+    from clyngor.answers import Answers
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 file_cache: Dict[str, bytes] = {}
@@ -23,17 +27,79 @@ DRACO_LP = [
     "task.lp"
 ]
 
+# 求解后端: "session" 复用同一数据集已接地的程序, "api" 每次查询在进程内新建 clingo.Control,
+# "subprocess" 为每次查询启动 clingo 进程
+SOLVER_BACKEND = "session"
+
+# 编辑操作代价的优化模式: None 时不加入代价, 按枚举顺序返回答案, 由 EditFunc.GetCost 计算代价;
+# 设为 clingo 的 --opt-mode 取值时加入 COST_LP 与代价事实, 答案按代价升序返回: "optN" 只返回代价最小的模型,
+# "enum" 枚举全部模型并带上各自代价 (取代价最小的 num 个), "opt" 返回逐步改进的模型序列
+OPT_MODE = None
+COST_LP = "cost.lp"
+# 编辑操作代价为两位小数, 乘以 COST_SCALE 后作为整数权重
+COST_SCALE = 100
+
+
+def json_scalar(value):
+    """NumPy 标量 (及 0 维数组) 按 .item() 转为 Python 数值; 其余不可序列化的值直接报错, 不会被 str() 折叠成相同的键"""
+    if getattr(value, "ndim", None) == 0:
+        return value.item()
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+def canonical_json(value) -> str:
+    """规范化 JSON (键排序、无空白)"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=json_scalar)
+
+
+class ChartSpec:
+    """不可变的图表规范值: 保存规范化的 Vega-Lite JSON, 并预先计算哈希与字段;
+    代价会在去重合并时变化, 只保存在 Result.cost 上"""
+    __slots__ = ("key", "hash", "fields")
+
+    def __init__(self, key: str, fields=()):
+        object.__setattr__(self, "key", key)
+        object.__setattr__(self, "hash", hash(key))
+        object.__setattr__(self, "fields", frozenset(fields))
+
+    @classmethod
+    def from_vl(cls, vl: Dict, fields=()):
+        return cls(canonical_json(vl), fields)
+
+    def as_vl(self) -> Dict:
+        return json.loads(self.key)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ChartSpec is immutable")
+
+    def __eq__(self, other):
+        return isinstance(other, ChartSpec) and self.key == other.key
+
+    def __hash__(self):
+        return self.hash
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return ChartSpec, (self.key, self.fields)
+
+
 # Answer Class
 class Result:
-    props: List[str]
+    __slots__ = ("_props", "cost", "Ops", "fields", "count", "task", "svg", "key")
     cost: Optional[int]
     Ops: List[str]
     fields:List[str]
     count:int
     task:set()
     svg:List
+    key: Optional[str]
 
-    def __init__(self, answers: Answers, cost: Optional[int] = None):
+    def __init__(self, answers: "Answers", cost: Optional[int] = None):
         props: List[str] = []
         Ops: List[str] = []
         for ((head, body),) in answers:
@@ -51,6 +117,22 @@ class Result:
         self.task=set()
         self.svg=[]
 
+    @property
+    def props(self):
+        return self._props
+
+    @props.setter
+    def props(self, props):
+        # 重新赋值后指纹失效; 原地修改 props 后应重新赋值
+        self._props = props
+        self.key = None
+
+    @classmethod
+    def from_props(cls, props: List[str], cost: Optional[int] = None):
+        result = cls([], cost)
+        result.props = list(props)
+        return result
+
     def __lt__(self, other):  # override <操作符
         if self.count>other.count:
             return True
@@ -61,9 +143,31 @@ class Result:
         return False
     
     def __eq__(self, other):
-        return self.props == other.props
+        return self.fingerprint() == other.fingerprint()
+
+    def __copy__(self):
+        """浅拷贝: 共享 props 与 spec, 只复制排序时会修改的标量和集合"""
+        result = Result.__new__(Result)
+        for name in Result.__slots__:
+            setattr(result, name, getattr(self, name))
+        result.task = set(self.task)
+        return result
+
+    def fingerprint(self) -> str:
+        """props 的规范化 JSON 表示, 相等的 props 得到相同的字符串, 可直接作为字典键去重; 每次赋值只计算一次"""
+        if self.key is None:
+            self.key = canonical_json(self.props)
+        return self.key
+
+    def to_spec(self) -> ChartSpec:
+        """序列化时按当前 props 构造 ChartSpec (props 的原地修改也会体现), 并以其键刷新 fingerprint"""
+        spec = ChartSpec.from_vl(self.props, self.fields)
+        self.key = spec.key
+        return spec
 
     def as_vl(self) -> Dict:
+        from Transform import Asp2Vl
+
         return Asp2Vl(self.props)
 
 
@@ -83,7 +187,9 @@ def run_clingo(
         files: List[str] = None,
         relax_hard=False,
         silence_warnings=False,
-        debug=False):
+        debug=False,
+        limit=0,
+        opt_mode=None):
     """运行 CLingo 并返回 stderr 和 stdout"""
     files = files or DRACO_LP
 
@@ -94,9 +200,11 @@ def run_clingo(
 
     #     options = ["--outf=2", "--quiet=1,2,2"]
     # options = ["--outf=2"]
-    options = ["--outf=2", "-n 0", "--project"]
+    options = ["--outf=2", f"-n {limit}", "--project"]
     if silence_warnings:
         options.append("--warn=no-atom-undefined")
+    if opt_mode is not None:
+        options.append(f"--opt-mode={opt_mode}")
     for name, value in constants.items():
         options.append(f"-c {name}={value}")
 
@@ -119,6 +227,278 @@ def run_clingo(
     return (stderr, stdout)
 
 
+def control_options(constants: Dict[str, str] = None, silence_warnings=False, opt_mode=None) -> List[str]:
+    """构造 clingo.Control 的命令行参数"""
+    options = ["--models=0", "--project"]
+    if silence_warnings:
+        options.append("--warn=no-atom-undefined")
+    if opt_mode is not None:
+        options.append("--opt-mode=%s" % opt_mode)
+    for name, value in (constants or {}).items():
+        options.extend(["-c", f"{name}={value}"])
+    return options
+
+
+def solve_models(ctl, num=0, limit=0) -> List[List[clingo.Symbol]]:
+    """流式枚举模型: 只保留最后 num 个模型 (0 为全部), 枚举 limit 个模型后停止搜索 (0 为不限)"""
+    ctl.configuration.solve.models = str(limit)
+    models = deque(maxlen=num or None)
+    with ctl.solve(yield_=True) as handle:
+        for model in handle:
+            models.append(sorted(model.symbols(shown=True)))
+    return list(models)
+
+
+def solve_optimal_models(ctl, num=0, limit=0, opt_mode=None) -> List[tuple]:
+    """优化模式下枚举模型, 返回按代价升序排列的 (显示原子, 代价) 的前 num 个 (0 为全部);
+    optN 模式只保留已证明最优的模型"""
+    ctl.configuration.solve.models = str(limit)
+    models = {}
+    with ctl.solve(yield_=True) as handle:
+        for model in handle:
+            if opt_mode == "optN" and not model.optimality_proven:
+                continue
+            symbols = sorted(model.symbols(shown=True))
+            models.setdefault(tuple(symbols), (symbols, sum(model.cost)))
+    ranked = sorted(models.values(), key=lambda item: item[1])
+    return ranked[:num] if num else ranked
+
+
+def solve_quota_models(ctl, quota: Dict, limit=0) -> List[List[clingo.Symbol]]:
+    """按配额枚举模型: 每个模型计入第一个仍开放的槽位; 槽位配额用完或字段达到复用上限时,
+    把对应外部原子置真后重新求解, 全部配额填满即停止。槽位按枚举顺序填满, 不按代价从低到高"""
+    remaining = dict(quota['quotas'])
+    groups = dict(quota['slots'])
+    externals = []
+
+    def close(symbol):
+        ctl.assign_external(symbol, True)
+        externals.append(symbol)
+
+    for slot in groups:
+        if remaining.get(slot, 0) <= 0:
+            close(clingo.Function("quota_closed", [clingo.Function(slot)]))
+    used = {}
+    seen = set()
+    models = []
+    ctl.configuration.solve.models = "0"
+    try:
+        while any(remaining.get(slot, 0) > 0 for slot in groups) and not (limit and len(models) >= limit):
+            closing = []
+            with ctl.solve(yield_=True) as handle:
+                for model in handle:
+                    symbols = sorted(model.symbols(shown=True))
+                    key = tuple(symbols)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    slot = next((slot for slot in groups if remaining.get(slot, 0) > 0 and
+                                 model.contains(clingo.Function("slot_open", [clingo.Function(slot)]))), None)
+                    if slot is None:
+                        continue
+                    models.append(symbols)
+                    remaining[slot] -= 1
+                    if remaining[slot] == 0:
+                        closing.append(clingo.Function("quota_closed", [clingo.Function(slot)]))
+                    group = groups[slot]
+                    if group is not None:
+                        for symbol in symbols:
+                            if symbol.name != "field":
+                                continue
+                            field = symbol.arguments[1]
+                            used[group, field] = used.get((group, field), 0) + 1
+                            if used[group, field] == quota['groups'][group]:
+                                closing.append(clingo.Function("field_closed", [clingo.Function(group), field]))
+                    if closing or (limit and len(models) >= limit):
+                        break
+            if not closing:
+                break
+            for symbol in closing:
+                close(symbol)
+    finally:
+        # 会话会被其他任务复用, 求解结束后恢复外部原子
+        for symbol in externals:
+            ctl.assign_external(symbol, False)
+    return models
+
+
+def solve_clingo(
+        draco_query: List[str],
+        constants: Dict[str, str] = None,
+        files: List[str] = None,
+        relax_hard=False,
+        silence_warnings=False,
+        debug=False,
+        num=0,
+        limit=0,
+        quota: Optional[Dict] = None,
+        opt_mode=None):
+    """在进程内通过 clingo.Control 求解, 按枚举顺序返回每个模型排序后的显示原子;
+    给出 opt_mode 时返回按代价排序的 (显示原子, 代价)"""
+    files = files or DRACO_LP
+
+    if relax_hard and "hard-integrity.lp" in files:
+        files.remove("hard-integrity.lp")
+
+    options = control_options(constants, silence_warnings, opt_mode)
+    logger.debug("Control: %s", " ".join(options))
+    ctl = clingo.Control(options)
+    program = u"\n".join(draco_query)
+    file_names = [os.path.join(DRACO_LP_DIR, f) for f in files]
+    ctl.add("base", [], b"\n".join(map(load_file, file_names)).decode("utf8") + program)
+    if debug:
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as fd:
+            fd.write(program)
+
+            logger.info('Debug ASP with "clingo %s %s"',
+                        " ".join(file_names), fd.name)
+    ctl.ground([("base", [])])
+    if quota is not None:
+        return solve_quota_models(ctl, quota, limit)
+    if opt_mode is not None:
+        return solve_optimal_models(ctl, num, limit, opt_mode)
+    return solve_models(ctl, num, limit)
+
+
+# 任务原子声明为外部原子, 同一数据集的不同任务共享一次接地
+TASK_EXTERNAL = "#external task(T) : tasks(T)."
+
+
+class ClingoSession:
+    """持久化求解会话: 基础程序只读取和解析一次, 数据事实相同的查询复用已接地的程序"""
+
+    def __init__(self, constants: Dict[str, str] = None, files: List[str] = None, silence_warnings=False,
+                 opt_mode=None):
+        self.options = control_options(constants, silence_warnings, opt_mode)
+        self.opt_mode = opt_mode
+        file_names = [os.path.join(DRACO_LP_DIR, f) for f in (files or DRACO_LP)]
+        base = b"\n".join(map(load_file, file_names)).decode("utf8")
+        self.base = []
+        clingo.ast.parse_string(base + "\n" + TASK_EXTERNAL, self.base.append)
+        self.ctl = None
+        self.query = None
+        self.tasks = {}
+
+    def ground(self, draco_query: List[str]):
+        """接地基础程序与一个数据集的事实, 任务保持为未赋值的外部原子"""
+        ctl = clingo.Control(self.options)
+        with clingo.ast.ProgramBuilder(ctl) as builder:
+            for statement in self.base:
+                builder.add(statement)
+            clingo.ast.parse_string(u"\n".join(draco_query), builder.add)
+        ctl.ground([("base", [])])
+        self.tasks = {str(atom.symbol.arguments[0]): atom.symbol
+                      for atom in ctl.symbolic_atoms.by_signature("task", 1) if atom.is_external}
+        self.ctl = ctl
+        self.query = list(draco_query)
+
+    def solve(self, draco_query: List[str], task: Optional[str] = None, num=0, limit=0,
+              quota: Optional[Dict] = None) -> List[List[clingo.Symbol]]:
+        """求解单个任务; 数据事实变化时才重新接地, 给出 quota 时按配额枚举, 优化模式下返回 (显示原子, 代价)"""
+        if self.ctl is None or self.query != draco_query:
+            self.ground(draco_query)
+        if task is not None and task not in self.tasks:
+            return []
+        for name, symbol in self.tasks.items():
+            self.ctl.assign_external(symbol, name == task)
+        if quota is not None:
+            return solve_quota_models(self.ctl, quota, limit)
+        if self.opt_mode is not None:
+            return solve_optimal_models(self.ctl, num, limit, self.opt_mode)
+        return solve_models(self.ctl, num, limit)
+
+    def solve_tasks(self, draco_query: List[str], tasks: List[str], num=0, limit=0) -> Dict[str, List[List[clingo.Symbol]]]:
+        """数据事实只接地一次, 依次切换 task 外部原子求解每个任务"""
+        return {task: self.solve(draco_query, task, num, limit) for task in tasks}
+
+
+sessions: Dict[tuple, ClingoSession] = {}
+
+
+def get_session(constants: Dict[str, str] = None, files: List[str] = None, silence_warnings=False,
+                opt_mode=None) -> ClingoSession:
+    """按常量、文件和选项复用求解会话"""
+    key = (tuple(sorted((constants or {}).items())), tuple(files or DRACO_LP), silence_warnings, opt_mode)
+    session = sessions.get(key)
+    if session is None:
+        session = sessions[key] = ClingoSession(constants, files, silence_warnings, opt_mode)
+    return session
+
+
+def models_to_results(models: List[List[clingo.Symbol]], num: int, opt_mode=None) -> Optional[List[Result]]:
+    """与 CLI 路径一致: 保留最后 num 个模型并倒序; 优化模式下模型已按代价排序, 代价换算回编辑操作代价"""
+    if len(models) == 0:
+        return None
+    if opt_mode is not None:
+        return [Result(symbols_to_answers(symbols), cost=cost / COST_SCALE) for symbols, cost in models]
+    AnsNumber = len(models) if num == 0 else min(len(models), num)
+    answers = models[len(models) - AnsNumber:]
+    answers.reverse()
+    return [Result(symbols_to_answers(symbols), cost=0) for symbols in answers]
+
+
+def symbols_to_answers(symbols):
+    """将 clingo 符号转换为与 clyngor.Answers(...).sorted 相同的结构"""
+    return [((symbol.name, tuple(map(str, symbol.arguments))),) for symbol in symbols]
+
+
+cost_fact_cache: List[str] = []
+
+
+def cost_facts() -> List[str]:
+    """把 EditFunc 使用的编辑操作代价表 (CostModel.load_edit_costs) 写成 cost.lp 使用的整数权重事实, 只生成一次"""
+    if cost_fact_cache:
+        return cost_fact_cache
+    from EditFunc import cost_model as model
+
+    def weight(index):
+        return round(model.costs[index] * COST_SCALE)
+
+    facts = []
+    for (task, mark), index in model.marks.items():
+        facts.append('mark_cost(%s,%s,%d).' % (task, mark, weight(index)))
+    for (t, value), index in model.transforms.items():
+        op = t if value is None else '%s(%s)' % (t, value.lower())
+        facts.append('transform_cost(%s,%d).' % (op, weight(index)))
+    for channel, index in model.channels.items():
+        facts.append('channel_cost(%s,%d).' % (channel, weight(index)))
+    cost_fact_cache.extend(facts)
+    return cost_fact_cache
+
+
+def optimizing(quota: Optional[Dict] = None):
+    """当前查询实际使用的优化模式: 按配额枚举时模型由配额决定, 不做代价优化"""
+    return OPT_MODE if quota is None else None
+
+
+def with_costs(draco_query: List[str], files: List[str] = None, opt_mode=None):
+    """优化模式下在程序中加入 cost.lp 与代价事实, 二者也因此进入缓存键"""
+    if opt_mode is None:
+        return draco_query, files
+    return draco_query + cost_facts(), list(files or DRACO_LP) + [COST_LP]
+
+
+# 答案集磁盘缓存, 设为 None 可关闭
+answer_cache: Optional[AnswerCache] = AnswerCache()
+
+
+def cache_key(draco_query: List[str], constants: Dict[str, str] = None, files: List[str] = None, options=()) -> str:
+    file_names = [os.path.join(DRACO_LP_DIR, f) for f in (files or DRACO_LP)]
+    return answer_cache.key(list(map(load_file, file_names)), draco_query, constants, options)
+
+
+def cache_value(results: Optional[List[Result]]):
+    if results is None:
+        return None
+    return [(result.props, result.cost) for result in results]
+
+
+def cached_results(value) -> Optional[List[Result]]:
+    if value is None:
+        return None
+    return [Result.from_props(props, cost) for props, cost in value]
+
+
 lock = threading.Lock()
 def run(
         draco_query: List[str],
@@ -128,17 +508,83 @@ def run(
         silence_warnings=False,
         debug=False,
         clear_cache=False,
-        num=10):
-    """ 运行 clingo 计算部分规范或违规行为的完成度。 """
+        num=10,
+        backend=None,
+        task=None,
+        limit=0,
+        use_cache=True,
+        quota: Optional[Dict] = None):
+    """ 运行 clingo 计算部分规范或违规行为的完成度。
+
+    num 为保留的答案数 (0 为全部), limit 为枚举预算: 找到 limit 个模型后停止搜索 (0 为枚举全部)。
+    quota 为图表配额 (见 ChartQuota.quota_spec): 其事实加入查询, 进程内后端按配额枚举。
+    OPT_MODE 不为 None 且没有配额时, 由 clingo 按编辑操作代价优化, 答案按代价升序返回并带有代价。
+    相同的程序、常量和选项直接从 answer_cache 读取答案, 不再调用求解器。
+    """
 
     # 清除文件缓存，在笔记本开发过程中非常有用。
     if clear_cache and file_cache:
         logger.warning("Cleared file cache")
         file_cache.clear()
+    opt_mode = optimizing(quota)
+    draco_query, files = with_costs(draco_query, files, opt_mode)
+    key = None
+    if use_cache and answer_cache is not None and not debug:
+        options = (relax_hard, silence_warnings, num, limit, task)
+        if quota is not None:
+            options += (json.dumps(quota, sort_keys=True),)
+        if opt_mode is not None:
+            options += (opt_mode,)
+        key = cache_key(draco_query, constants, files, options)
+        hit, value = answer_cache.get(key)
+        if hit:
+            return cached_results(value)
+    results = solve_results(
+        draco_query, constants, files, relax_hard, silence_warnings, debug, clear_cache, num, backend, task, limit, quota,
+        opt_mode
+    )
+    if key is not None:
+        answer_cache.put(key, cache_value(results))
+    return results
+
+
+def solve_results(
+        draco_query: List[str],
+        constants: Dict[str, str] = None,
+        files: List[str] = None,
+        relax_hard=False,
+        silence_warnings=False,
+        debug=False,
+        clear_cache=False,
+        num=10,
+        backend=None,
+        task=None,
+        limit=0,
+        quota: Optional[Dict] = None,
+        opt_mode=None):
+    """ 不经过缓存, 按所选后端求解并解析答案; 给出 opt_mode 时程序中应已包含代价 (见 with_costs)。 """
+    backend = backend or SOLVER_BACKEND
+    if quota is not None:
+        draco_query = draco_query + quota['facts']
+    if backend == "session" and not relax_hard and not debug:
+        if clear_cache:
+            sessions.clear()
+        with lock:
+            models = get_session(constants, files, silence_warnings, opt_mode).solve(draco_query, task, num, limit, quota)
+        return models_to_results(models, num, opt_mode)
+    if task is not None:
+        draco_query = draco_query + ['task(%s).' % (task)]
+    if backend in ("api", "session"):
+        models = solve_clingo(
+            draco_query, constants, files, relax_hard, silence_warnings, debug, num, limit, quota, opt_mode
+        )
+        return models_to_results(models, num, opt_mode)
+    elif backend != "subprocess":
+        raise ValueError("Unsupported solver backend: %s" % backend)
     # Call CLingo
     # time_s = time()
     stderr, stdout = run_clingo(
-        draco_query, constants, files, relax_hard, silence_warnings, debug
+        draco_query, constants, files, relax_hard, silence_warnings, debug, limit, opt_mode
     )
     # time_e = time()
     # print("Clingo time last %f " % (time_e - time_s))
@@ -149,6 +595,8 @@ def run(
         logger.error("stderr: %s", stderr)
         raise
     # Analysis CLingo stdout
+    import clyngor
+
     result = json_result["Result"]
     if result == "OPTIMUM FOUND" or "SATISFIABLE":
         StdoutNumber = json_result["Models"]["Number"]
@@ -157,18 +605,65 @@ def run(
         else:
             AnsNumber = StdoutNumber if StdoutNumber < num else num
         if "Witnesses" in json_result["Call"][0]:
-            answers = json_result["Call"][0]["Witnesses"][StdoutNumber - AnsNumber:]
-            answers.reverse()
+            answers = json_result["Call"][0]["Witnesses"]
+            if opt_mode is not None:
+                # 按代价升序取前 num 个; optN 的最优模型集合排在改进序列之后, 取最后 Optimal 个
+                if opt_mode == "optN":
+                    answers = answers[len(answers) - json_result["Models"].get("Optimal", len(answers)):]
+                answers = sorted(answers, key=lambda answer: sum(answer["Costs"]))
+                AnsNumber = len(answers) if num == 0 else min(len(answers), num)
+                answers = answers[:AnsNumber]
+            else:
+                answers = answers[StdoutNumber - AnsNumber:]
+                answers.reverse()
         else:
             return None
         AnswerList=[]
         for i in range(AnsNumber):
-        #     # if 'Cost' in answers[i]:
-        #     #     AnswerList.append(Result(clyngor.Answers(answers[i]["Value"]).sorted, cost=answers[i]["Costs"]))
-        #     # else:
-            AnswerList.append(Result(clyngor.Answers(answers[i]["Value"]).sorted, cost=0))
+            if 'Costs' in answers[i]:
+                AnswerList.append(Result(clyngor.Answers(answers[i]["Value"]).sorted,
+                                         cost=sum(answers[i]["Costs"]) / COST_SCALE))
+            else:
+                AnswerList.append(Result(clyngor.Answers(answers[i]["Value"]).sorted, cost=0))
         # print("Find %d answers, select top%d" % (StdoutNumber, len(AnswerList)))
         return AnswerList
     else:
         logger.error("Unsupported result: %s", result)
         return None
+
+
+def run_tasks(
+        draco_query: List[str],
+        tasks: List[str],
+        constants: Dict[str, str] = None,
+        files: List[str] = None,
+        silence_warnings=False,
+        num=10,
+        backend=None,
+        limit=0,
+        use_cache=True) -> Dict[str, Optional[List[Result]]]:
+    """ 对同一数据集一次性求解多个任务, 返回 {任务: 答案列表}; 缓存命中的任务不再求解。 """
+    backend = backend or SOLVER_BACKEND
+    if backend != "session":
+        return {task: run(draco_query, constants, files, silence_warnings=silence_warnings,
+                          num=num, backend=backend, task=task, limit=limit, use_cache=use_cache) for task in tasks}
+    opt_mode = optimizing()
+    draco_query, files = with_costs(draco_query, files, opt_mode)
+    options = () if opt_mode is None else (opt_mode,)
+    task_results = {}
+    keys = {}
+    for task in tasks:
+        if use_cache and answer_cache is not None:
+            keys[task] = cache_key(draco_query, constants, files, (False, silence_warnings, num, limit, task) + options)
+            hit, value = answer_cache.get(keys[task])
+            if hit:
+                task_results[task] = cached_results(value)
+    missing = [task for task in tasks if task not in task_results]
+    if missing:
+        with lock:
+            task_models = get_session(constants, files, silence_warnings, opt_mode).solve_tasks(draco_query, missing, num, limit)
+        for task, models in task_models.items():
+            task_results[task] = models_to_results(models, num, opt_mode)
+            if task in keys:
+                answer_cache.put(keys[task], cache_value(task_results[task]))
+    return {task: task_results[task] for task in tasks}
@@ -2,11 +2,14 @@ from llm_enhance.api.deepseek_llm import DeepSeekTextGenerator
 
 import json
 import logging
+import time
 import pandas as pd
 import numpy as np
 import random
 from tqdm import tqdm
 
+from AsyncEnrich import BACKOFF_BASE, BACKOFF_MAX, MAX_RETRIES, enrich, run_enrichment
+
 logger = logging.getLogger('zxc')
 
 SYSTEM_INSTRUCTIONS = """You are an assistant who specializes in writing the perfect Vega-lite visualization tool. 
@@ -14,7 +17,7 @@ Given a Vega-lite visualization configuration and a dataset field, you must unde
 filter type to add filter information to the Vega-lite visualization configuration.\n\n"""
 
 
-def add_filter(summary: dict, vega, filter_type, text_gen: DeepSeekTextGenerator):
+def filter_messages(summary: dict, vega, filter_type):
     user_prompt = f"""
 # Ability
 - Additional filtering information must be guaranteed to be useful.
@@ -40,15 +43,37 @@ def add_filter(summary: dict, vega, filter_type, text_gen: DeepSeekTextGenerator
         {"role": "assistant",
          "content":
              f"{user_prompt}\n\n You just need to add {filter_type} type filter transform.filter, transform.filter should be a string. You just need to return the json configuration of vega-lite."}]
+    return messages
+
+
+def add_filter(summary: dict, vega, filter_type, text_gen: DeepSeekTextGenerator):
+    messages = filter_messages(summary, vega, filter_type)
+    attempt = 0
     while True:
         try:
-            response = text_gen.generate_json(messages=messages)
-            break
+            return text_gen.generate_json(messages=messages)
         except Exception as e:
-            pass
-    return response
+            if attempt >= MAX_RETRIES:
+                raise
+            logger.warning("generate_json failed (%s), retry %d", e, attempt + 1)
+            time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
 
-def generate_filter():
+
+def random_filter_type():
+    random_number = random.random()
+    if 0 < random_number <= 0.3:
+        return "Multi-conditional"
+    elif 0.3 < random_number <= 0.6:
+        return "Single"
+    elif 0.6 < random_number <= 0.8:
+        return "AND"
+    else:
+        return "OR"
+
+
+def generate_filter(**options):
+    """为各任务的目标图表并发添加筛选信息; options 传给 AsyncEnrich.AsyncLLMClient (并发数、限流等)"""
     task_rank = {
         'change_over_time': 3,
         'characterize_distribution': 1,
@@ -61,32 +86,30 @@ def generate_filter():
         'retrieve_value': 1
     }
     tasks = list(task_rank.keys())
-    for task in tqdm(tasks):
+    with open(r'C:\Users\admin\PycharmProjects\create_vis_data\get_data_two\data\new_data_summary.json', 'r', encoding='utf-8') as file:
+        data_list = json.load(file)
+    summaries = {data['id']: data['summary'] for data in data_list}
+    progress = tqdm(total=len(tasks))
 
+    async def filter_task(client, task):
         with open(fr"C:\Users\admin\PycharmProjects\create_vis_data\get_data_two\init_asp\new_task_chart\{task}.json", 'r',encoding='utf-8') as f:
             init_data = json.load(f)
-        textgen = DeepSeekTextGenerator()
-
-        with open(r'C:\Users\admin\PycharmProjects\create_vis_data\get_data_two\data\new_data_summary.json', 'r', encoding='utf-8') as file:
-            data_list = json.load(file)
-        for index, select in enumerate(init_data):
-            print(index)
-            random_number = random.random()
-            if 0 < random_number <= 0.3:
-                filter_type = "Multi-conditional"
-            elif 0.3 < random_number <= 0.6:
-                filter_type = "Single"
-            elif 0.6 < random_number <= 0.8:
-                filter_type = "AND"
+        prompts = []
+        for select in init_data:
+            filter_type = random_filter_type()
+            if select['file'] in summaries:
+                prompts.append(filter_messages(summaries[select['file']], select['vega-lite'], filter_type))
             else:
-                filter_type = "OR"
-            for data in data_list:
-                if data['id'] == select['file']:
-                    new_vega = add_filter(data['summary'], select['vega-lite'], filter_type, textgen)
-                    new_vega = json.loads(new_vega)
-                    init_data[index]["vega-lite"] = new_vega
+                prompts.append(None)
+        for index, new_vega in enumerate(await enrich(client, prompts)):
+            if new_vega is not None:
+                init_data[index]["vega-lite"] = new_vega
+
+        with open(rf"new_data_chart/{task}-filter.json", 'w',
+                  encoding='utf-8') as f:
 
-            with open(rf"new_data_chart/{task}-filter.json", 'w',
-                      encoding='utf-8') as f:
+            json.dump(init_data, f, ensure_ascii=False, indent=4)
+        progress.update(1)
 
-                json.dump(init_data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+    run_enrichment(lambda client: [filter_task(client, task) for task in tasks], **options)
+    progress.close()
@@ -7,12 +7,14 @@ import random
 from tqdm import tqdm
 import json
 
+from AsyncEnrich import enrich, run_enrichment
+
 logger = logging.getLogger('zxc')
 
 SYSTEM_INSTRUCTIONS = """You are an assistant who specializes in writing the perfect Vega-lite visualization tool. Given a Vega-lite visualization configuration and a dataset field, you must understand the dataset and choose a sort type to add sort information to the Vega-lite visualization configuration.\n\n"""
 
 
-def add_filter(summary: dict, vega, sort_type, text_gen: DeepSeekTextGenerator):
+def sort_messages(summary: dict, vega, sort_type):
     user_prompt = f"""
 # Ability
 - Sorting information can only be constructed for nominal and quantitative fields.
@@ -34,13 +36,18 @@ def add_filter(summary: dict, vega, sort_type, text_gen: DeepSeekTextGenerator):
         {"role": "assistant",
          "content":
              f"{user_prompt}\n\n You just need to add {sort_type} type sort. You just need to return the json configuration of vega-lite."}]
+    return messages
+
 
+def add_filter(summary: dict, vega, sort_type, text_gen: DeepSeekTextGenerator):
+    messages = sort_messages(summary, vega, sort_type)
     response = text_gen.generate_json(messages=messages)
 
     return response
 
 
-def generate_sort():
+def generate_sort(**options):
+    """为各任务的柱状图并发添加排序信息; options 传给 AsyncEnrich.AsyncLLMClient (并发数、限流等)"""
     task_rank = {
         'change_over_time': 3,
         'characterize_distribution': 1,
@@ -53,30 +60,32 @@ def generate_sort():
         'retrieve_value': 1,
     }
     tasks = list(task_rank.keys())
-    for task in tqdm(tasks):
+    with open(r'C:\Users\admin\PycharmProjects\create_vis_data\get_data_two\data\new_data_summary.json', 'r', encoding='utf-8') as file:
+        data_list = json.load(file)
+    summaries = {data['id']: data['summary'] for data in data_list}
+    progress = tqdm(total=len(tasks))
 
+    async def sort_task(client, task):
         with open(fr"new_data_chart/{task}-filter.json", 'r',encoding='utf-8') as f:
             init_data = json.load(f)
-        textgen = DeepSeekTextGenerator()
-
-        with open(r'C:\Users\admin\PycharmProjects\create_vis_data\get_data_two\data\new_data_summary.json', 'r', encoding='utf-8') as file:
-            data_list = json.load(file)
+        sort_type = "Sort by Another Encoding"
+        prompts = []
+        for select in init_data:
+            if select["mark"] != 'bar' or select['file'] not in summaries:
+                prompts.append(None)
+            else:
+                prompts.append(sort_messages(summaries[select['file']], select['vega-lite'], sort_type))
         modify_index = []
-        for index, select in enumerate(init_data):
-            if select["mark"] != 'bar':
-                continue
-            print(select["mark"])
-            print(index)
-            sort_type = "Sort by Another Encoding"
-
-            for data in data_list:
-                if data['id'] == select['file']:
-                    new_vega = add_filter(data['summary'], select['vega-lite'], sort_type, textgen)
-                    new_vega = json.loads(new_vega)
-                    init_data[index]['vega-lite'] = new_vega
-                    modify_index.append(index)
+        for index, new_vega in enumerate(await enrich(client, prompts)):
+            if new_vega is not None:
+                init_data[index]['vega-lite'] = new_vega
+                modify_index.append(index)
 
         with open(rf"new_data_chart/{task}-sort.json", 'w',
                   encoding='utf-8') as f:
 
             json.dump(init_data, f, ensure_ascii=False, indent=4)
+        progress.update(1)
+
+    run_enrichment(lambda client: [sort_task(client, task) for task in tasks], **options)
+    progress.close()
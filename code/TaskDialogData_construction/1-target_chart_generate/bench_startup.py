@@ -0,0 +1,63 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+# 单个数据集的命令行调用应在该时间内完成启动 (秒)
+STARTUP_TARGET = 1.0
+
+# 导入这些模块后仍不应加载的重依赖 (只在用到时于函数内导入)
+LAZY_MODULES = ('numpy', 'pandas', 'scipy', 'pyarrow')
+# 需要检查重依赖是否被提前加载的模块
+LAZY_IMPORTS = ('output', 'task_chart_generate')
+
+# 各条命令均在全新解释器中执行, 测得的是冷启动时间
+COMMANDS = {
+    'import output': [sys.executable, '-c', 'import output'],
+    'import task_chart_generate': [sys.executable, '-c', 'import task_chart_generate'],
+    'result.py --help': [sys.executable, 'result.py', '--help'],
+}
+
+
+def measure(cmd, repeat):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append(perf_counter() - start)
+    return statistics.median(times)
+
+
+def eager_modules(module):
+    """在全新解释器中导入 module, 返回被一并加载的重依赖"""
+    code = "import sys, %s; print(' '.join(m for m in %r if m in sys.modules))" % (module, LAZY_MODULES)
+    out = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE, text=True).stdout
+    return out.split()
+
+
+def main(repeat=5):
+    eager = []
+    for module in LAZY_IMPORTS:
+        loaded = eager_modules(module)
+        if loaded:
+            print("import %s loads %s" % (module, ", ".join(loaded)))
+            eager.append(module)
+    slow = []
+    for name, cmd in COMMANDS.items():
+        elapsed = measure(cmd, repeat)
+        print("%-30s %.3fs" % (name, elapsed))
+        if elapsed > STARTUP_TARGET:
+            slow.append(name)
+    if slow:
+        print("startup above %.1fs: %s" % (STARTUP_TARGET, ", ".join(slow)))
+    if slow or eager:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the target-chart generator.")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per command, the median is reported")
+    args = parser.parse_args()
+    sys.exit(main(args.repeat))
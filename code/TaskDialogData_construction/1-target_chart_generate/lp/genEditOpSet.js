@@ -1,42 +1,40 @@
 const fs = require('fs');
-function keys(obj) {
-  var k = [], x;
-  for (x in obj) {
-    k.push(x);
-  }
-  return k;
-};
+const path = require('path');
 
 // Generated from lp_yh01.m
-var costs = JSON.parse(fs.readFileSync('costs.json','utf8'));
+var costs = JSON.parse(fs.readFileSync(path.join(__dirname, 'costs.json'),'utf8'));
 //Generated from lp_yh01.js
-var map = JSON.parse(fs.readFileSync('idMap.json','utf8'));
+var map = JSON.parse(fs.readFileSync(path.join(__dirname, 'idMap.json'),'utf8'));
+// Rule sets (shared with lp.js and EditCostSolver.py); each action goes to the group of its rule set
+var ruleSet = JSON.parse(fs.readFileSync(path.join(__dirname, 'ruleSet.json'),'utf8'));
 // var encodingCeiling = JSON.parse(fs.readFileSync('encodingCeiling.json','utf8'));
 var depth=10
 
 var maxEncodingCost = 0;
 //Imports the lp result
-var editOpNames = keys(map);
 var editOpSet = {
                 markEditOps: {},
                 transformEditOps: {},
                 encodingEditOps: {}
               };
+// task rule sets (task__mark) are not part of editOpSet
+var groups = {
+  marktype: editOpSet.markEditOps,
+  transform: editOpSet.transformEditOps,
+  encoding: editOpSet.encodingEditOps
+};
 
-for (var i = 0; i < editOpNames.length; i++) {
-  if ( i <= 14 ) {
-    editOpSet.markEditOps[editOpNames[i]] = { name: editOpNames[i], cost: costs[i] };
-  }
-  else if( i <= 26 ){
-    editOpSet.transformEditOps[editOpNames[i]] = { name: editOpNames[i], cost: costs[i] };
-  }
-  else if(i<=146){
-    if (maxEncodingCost < costs[i] ) {
-      maxEncodingCost = costs[i];
+ruleSet.forEach(function(rs) {
+  var group = groups[rs.name];
+  if (group === undefined) return;
+  rs.actions.forEach(function(name) {
+    var cost = costs[map[name]];
+    if (rs.name === 'encoding' && maxEncodingCost < cost) {
+      maxEncodingCost = cost;
     }
-    editOpSet.encodingEditOps[editOpNames[i]] = { name: editOpNames[i], cost: costs[i] };
-  }
-};
+    group[name] = { name: name, cost: cost };
+  });
+});
 
 editOpSet.encodingEditOps['ceiling'] = {
   cost: maxEncodingCost * depth,
@@ -47,5 +45,4 @@ editOpSet.encodingEditOps['ceiling'] = {
 // };
 
 
-fs.writeFileSync('editOpSet.json',JSON.stringify(editOpSet));
-
+fs.writeFileSync(path.join(__dirname, 'editOpSet.json'),JSON.stringify(editOpSet, null, 4) + '\n');
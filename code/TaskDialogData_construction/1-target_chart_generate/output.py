@@ -1,16 +1,13 @@
-import pandas as pd
 from time import time
-from copy import deepcopy
+from copy import copy
 from typing import List
-from functools import reduce
-from threading import Thread, Lock
-from sklearn.cluster import DBSCAN
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from helper import *
 from Transform import Asp2Vl, Cql2Asp, GetNewColumnType
-from EditFunc import GetCost
-from RunClingo import run
+from EditFunc import GetCosts, GetFields
+from RunClingo import optimizing, run, run_tasks
+from DatasetProfile import DatasetProfile
 
 # from NLI.NLI import NL4DV
 # from NLI.helpers import get_attributemap_for_NLP
@@ -56,50 +53,79 @@ task_name = {
 }
 tasks = list(task_rank.keys())
 
-Recos_dedup = []
-lock = Lock()
-
 '''Individual Recommendation'''
 
-# 对不同的排名方案进行排序
-def rank(new, rankscheme, ColumnTypes={}):
-    news = deepcopy(new)
+# 对不同的排名方案进行排序: 不复制候选, 返回 (下标排列, 该方案下每个候选的 cost)
+def RankOrder(recos, rankscheme, ColumnTypes={}):
+    costs = [item.cost for item in recos]
+    counts = [item.count for item in recos]
+    order = list(range(len(recos)))
     if rankscheme == 1:  # Complexity-based
-        for item in news:
-            item.count = 1
-        news.sort()
+        counts = [1] * len(recos)
     elif rankscheme == 2:  # Reverse-complexity-based
-        news.sort()
-        cost = []
-        for item in news:
-            cost.append([item.cost, 0])
-        cost = np.asarray(cost)
-        label = DBSCAN(eps=0.5, min_samples=1).fit_predict(cost)
-        label = list(label)
-        clusters = list(set(label))
-        costmean = [0] * len(clusters)
-        for i in range(len(news)):
-            costmean[label[i]] += news[i].cost
-        for i in range(len(costmean)):
-            costmean[i] /= label.count(i)
-        costmean_reverse = deepcopy(costmean)
-        costmean_reverse.reverse()
-        for i in range(len(costmean)):
-            costmean[i] -= costmean_reverse[i]
-        for i in range(len(news)):
-            news[i].cost -= costmean[label[i]]
-        news.sort()
+        order.sort(key=lambda i: (-counts[i], costs[i]))
+        reversed_costs = ReverseComplexityCosts([costs[i] for i in order])
+        for k, i in enumerate(order):
+            costs[i] = float(reversed_costs[k])
     elif rankscheme == 3:  # Interested-columns-based
-        for item in news:
-            item.cost /= (len(item.fields) / len(ColumnTypes))
-        news.sort()
-    elif rankscheme == 4:  # Task-coverage-based
-        news.sort()
+        costs = [item.cost / (len(item.fields) / len(ColumnTypes)) for item in recos]
+    # rankscheme 4: Task-coverage-based
+    # 与 Result.__lt__ 等价: count 降序, cost 升序, 稳定排序
+    order.sort(key=lambda i: (-counts[i], costs[i]))
+    return order, costs
+
+
+def ReverseComplexityCosts(cost, eps=0.5):
+    """一维代价聚类后翻转各簇的平均代价.
+
+    等价于 DBSCAN(eps, min_samples=1) 作用在 [cost, 0] 上: 排序后相邻差值不超过 eps 的代价属于同一簇,
+    簇按首次出现的下标编号; 第 i 个簇的代价整体平移 mean_i - mean_{k-1-i}.
+    相邻差值恰好为 eps 时按精确差值判断, 不再受 sklearn 距离展开式舍入误差的影响.
+    """
+    import numpy as np
+
+    cost = np.asarray(cost, dtype=float)
+    n = len(cost)
+    if n == 0:
+        return cost
+    idx = np.argsort(cost, kind='stable')
+    sorted_cost = cost[idx]
+    breaks = np.flatnonzero(np.diff(sorted_cost) > eps) + 1
+    starts = np.concatenate(([0], breaks))
+    boundary = np.zeros(n, dtype=np.intp)
+    boundary[breaks] = 1
+    component = np.empty(n, dtype=np.intp)
+    component[idx] = np.cumsum(boundary)
+    # 与 DBSCAN 一致, 簇编号按簇内最小下标的先后顺序
+    first = np.minimum.reduceat(idx, starts)
+    label_of = np.empty(len(starts), dtype=np.intp)
+    label_of[np.argsort(first, kind='stable')] = np.arange(len(starts))
+    label = label_of[component]
+    # bincount 按下标顺序累加, 与逐个求和的结果一致
+    costmean = np.bincount(label, weights=cost) / np.bincount(label)
+    costmean -= costmean[::-1].copy()
+    return cost - costmean[label]
+
+
+def Unranked(recos):
+    order = list(range(len(recos)))
+    return order, [item.cost for item in recos]
+
+
+def rank(new, rankscheme, ColumnTypes={}):
+    order, costs = RankOrder(new, rankscheme, ColumnTypes)
+    news = []
+    for i in order:
+        item = copy(new[i])
+        item.cost = costs[i]
+        news.append(item)
     return news
 
 
-def IndivRecWithSingleTask(Data, ColumnTypes={}, task=None, DataAsp=None, Num=10):
-    # print(task)
+def BuildProgram(Data, ColumnTypes={}, DataAsp=None):
+    # DataAsp 为数据集画像时直接复用其中已生成的查询与数据事实
+    if isinstance(DataAsp, DatasetProfile):
+        return DataAsp.program
     if DataAsp is None:
         dataquery = data_to_asp(Data, ColumnTypes)
     else:
@@ -111,34 +137,75 @@ def IndivRecWithSingleTask(Data, ColumnTypes={}, task=None, DataAsp=None, Num=10
     for item in header:
         query_spec['encodings'].append({"field": item, "type": ColumnTypes[item]})
     query = Cql2Asp(query_spec)
-    if not task is None:
-        query.append('task(%s).' % (task))
-    program = query + dataquery
+    return query + dataquery
+
+
+def IndivRecWithSingleTask(Data, ColumnTypes={}, task=None, DataAsp=None, Num=10, Limit=0, Quota=None):
+    # print(task)
+    program = BuildProgram(Data, ColumnTypes, DataAsp)
     # print("program!:",program)
-    result = run(draco_query=program, num=Num)
+    result = run(draco_query=program, num=Num, task=task, limit=Limit, quota=Quota)
+    return ProcessAnswers(result, task, SolverCost=optimizing(Quota) is not None)
+
+
+def IndivRecWithTasks(Data, ColumnTypes={}, task_list=[], DataAsp=None, Num=10, Limit=0):
+    # 数据集事实只构造和接地一次, 所有任务在同一个求解会话中切换
+    program = BuildProgram(Data, ColumnTypes, DataAsp)
+    results = run_tasks(draco_query=program, tasks=task_list, num=Num, limit=Limit)
+    return {task: ProcessAnswers(result, task, SolverCost=optimizing() is not None) for task, result in results.items()}
+
 
+def ProcessAnswers(result, task=None, SolverCost=False):
     if result is None:
         # print("No Answers!")
         return None
 
     for ans in result:
         ans.Ops = ans.props
-        ans.props, ans.cost = Asp2Vl(ans.props, task)
-        ans.cost, ans.fields = GetCost(ans.props, task)
+        if SolverCost:
+            # 优化模式下代价已由 clingo 按编辑操作表计算, 只需取出字段
+            cost = ans.cost
+            ans.props, _ = Asp2Vl(ans.props, task)
+            ans.cost, ans.fields = cost, GetFields(ans.props)
+        else:
+            ans.props, ans.cost = Asp2Vl(ans.props, task)
+    if not SolverCost:
+        # 所有答案的代价一次批量计算
+        costs, fields = GetCosts([ans.props for ans in result], task)
+        for ans, cost, Match in zip(result, costs.tolist(), fields):
+            ans.cost, ans.fields = cost, Match
+    for ans in result:
         ans.props = DeLayer(ans.props)
-    news = reduce(lambda x, y: x if y in x else x + [y], [[], ] + result)
+    # 以 props 的规范化 JSON 为键去重, 保留第一次出现的答案
+    unique = {}
+    for ans in result:
+        unique.setdefault(ans.fingerprint(), ans)
+    news = list(unique.values())
 
     # print("After deduplication, left %d vis:" % (len(news)))
     news.sort()
     return news
 
 
-def Result2Json(res_):
-    res = deepcopy(res_)
+def Result2JsonRanks(recos, ranks):
+    # 每个候选只序列化一次, 各排名方案按 (下标排列, cost) 复用同一份 props
+    shared = [(ans.to_spec().as_vl(), list(ans.fields), list(ans.task)) for ans in recos]
+    res_with_rank = {}
+    for name, (order, costs) in ranks.items():
+        res_with_rank[name] = [{
+            "props": shared[i][0],
+            "cost": costs[i],
+            "field": shared[i][1],
+            "task": shared[i][2]
+        } for i in order]
+    return res_with_rank
+
+
+def Result2Json(res):
     task_res = []
     for ans in res:
         res_dict = {
-            "props": ans.props,
+            "props": ans.to_spec().as_vl(),
             "cost": ans.cost,
             "field": list(ans.fields),
             "task": list(ans.task)
@@ -160,68 +227,55 @@ def IndivRecWithMultiTasks(Data, ColumnTypes={}, task=[], DataAsp=None, Num=10,
                                          mode=mode)
 
 
-def RecommendationCombination(Data, ColumnTypes={}, DataAsp=None, Num=10, task_list=None, mode=2):
-    global Recos_dedup
+def RecommendationCombination(Data, ColumnTypes={}, DataAsp=None, Num=10, task_list=None, mode=2, Limit=0):
+    # 所有状态都是本次调用的局部变量, 不同数据集可以在多个进程/线程中并发推荐
     final_res = {}
     Recos_dedup = []
+    Recos_index = {}
     Recos_nodedup = {}
     tasklist = tasks if task_list is None else task_list
-
-    def process(start, end):
-        for i in range(start, end):
-            if not tasklist[i] in tasks:
-                raise Exception(print("No %s Task!" % (tasklist[i])))
-            Recos = IndivRecWithSingleTask(Data=Data, ColumnTypes=ColumnTypes, DataAsp=DataAsp, task=tasklist[i], Num=0)
-            if not Recos is None:
-                if mode == 2:
-                    res_with_rank = {}
-                    res_with_rank['R1'] = Result2Json(Recos)
-                    try:
-                        res_with_rank['R2'] = Result2Json(rank(Recos, 2, ColumnTypes))
-                    except:
-                        res_with_rank['R2'] = Result2Json(list(reversed(Recos)))
-                    res_with_rank['R3'] = Result2Json(rank(Recos, 3, ColumnTypes))
-                    res_with_rank['R4'] = Result2Json(Recos)
-                    Recos_nodedup[tasklist[i]] = res_with_rank
-                for res in Recos:
-                    lock.acquire()
-                    if res not in Recos_dedup:
-                        res.count = 1
-                        res.task.add(tasklist[i])
-                        Recos_dedup.append(res)
-                    else:
-                        Recos_dedup[Recos_dedup.index(res)].count += 1
-                        Recos_dedup[Recos_dedup.index(res)].cost += res.cost
-                        Recos_dedup[Recos_dedup.index(res)].task.add(tasklist[i])
-                    lock.release()
-
-    n = 8
-    start = end = 0
-    threads = []
-    for i in range(n):
-        start = end
-        end = int((i + 1) / n * len(tasklist))
-        th = Thread(target=process, args=(start, end))
-        threads.append(th)
-        th.start()
-    for t in threads:
-        t.join()
+    for task in tasklist:
+        if not task in tasks:
+            raise Exception(print("No %s Task!" % (task)))
+    TaskRecos = IndivRecWithTasks(Data=Data, ColumnTypes=ColumnTypes, DataAsp=DataAsp,
+                                  task_list=tasklist, Num=0, Limit=Limit)
+
+    for task in tasklist:
+        Recos = TaskRecos[task]
+        if Recos is None:
+            continue
+        if mode == 2:
+            ranks = {}
+            ranks['R1'] = Unranked(Recos)
+            ranks['R2'] = RankOrder(Recos, 2, ColumnTypes)
+            ranks['R3'] = RankOrder(Recos, 3, ColumnTypes)
+            ranks['R4'] = ranks['R1']
+            Recos_nodedup[task] = Result2JsonRanks(Recos, ranks)
+        for res in Recos:
+            key = res.fingerprint()
+            if key not in Recos_index:
+                res.count = 1
+                res.task.add(task)
+                Recos_index[key] = res
+                Recos_dedup.append(res)
+            else:
+                same = Recos_index[key]
+                same.count += 1
+                same.cost += res.cost
+                same.task.add(task)
 
     for item in Recos_dedup:
         item.cost /= item.count
     Recos_dedup.sort()
 
     if mode == 2:
-        res_with_rank2 = {}
-        res_with_rank2['R1'] = Result2Json(rank(Recos_dedup, 1, ColumnTypes))
-        try:
-            res_with_rank2['R2'] = Result2Json(rank(Recos_dedup, 2, ColumnTypes))
-        except:
-            res_with_rank2['R2'] = Result2Json(list(reversed(rank(Recos_dedup, 1, ColumnTypes))))
-        res_with_rank2['R3'] = Result2Json(rank(Recos_dedup, 3, ColumnTypes))
-        res_with_rank2['R4'] = Result2Json(rank(Recos_dedup, 4, ColumnTypes))
-
-        final_res['Recos_dedup'] = res_with_rank2
+        ranks = {}
+        ranks['R1'] = RankOrder(Recos_dedup, 1, ColumnTypes)
+        ranks['R2'] = RankOrder(Recos_dedup, 2, ColumnTypes)
+        ranks['R3'] = RankOrder(Recos_dedup, 3, ColumnTypes)
+        ranks['R4'] = RankOrder(Recos_dedup, 4, ColumnTypes)
+
+        final_res['Recos_dedup'] = Result2JsonRanks(Recos_dedup, ranks)
         final_res['Recos_nodedup'] = Recos_nodedup
         return final_res
     else:
@@ -235,6 +289,35 @@ def RecommendationCombination(Data, ColumnTypes={}, DataAsp=None, Num=10, task_l
 
 
 
+class RecommendationScheduler:
+    """并发调度多个数据集的推荐请求; 默认使用进程池, 每个进程持有独立的求解会话。"""
+
+    def __init__(self, workers=None, processes=True):
+        if processes:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            # subprocess 后端的求解在子进程中进行, 线程池即可
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, **kwargs):
+        """提交一次 RecommendationCombination 调用, 返回对应的 Future"""
+        return self.executor.submit(RecommendationCombination, **kwargs)
+
+    def map(self, requests):
+        """按提交顺序返回每个请求 (关键字参数字典) 的推荐结果"""
+        futures = [self.submit(**request) for request in requests]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
 def CombinationRecommendation(Data, ColumnTypes={}, task=[], DataAsp=None, mode=5):
 
     Recos_dedup = IndivRecWithMultiTasks(Data=Data, ColumnTypes=ColumnTypes, task=task, DataAsp=DataAsp, Num=0,
@@ -260,33 +343,21 @@ def CombinationRecommendation(Data, ColumnTypes={}, task=[], DataAsp=None, mode=
     return Result2Json(ANS)
 
 
-def TaskAPIs(Data, ColumnTypes: List[dict] = [], task=None, DataAsp=None, Num=10, mode=1):
-    ColumnDict = {}
-    if type(Data) is list:
-        Data = pd.DataFrame(Data)
-    elif type(Data) is pd.DataFrame:
-        pass
-    else:
-        raise Exception(print("Data invaild."))
-    # print(ColumnTypes)
-    if len(ColumnTypes) == 0:
-        keys = list(Data.columns)
-        for key in keys:
-            ColumnDict[key] = 'unknown'
-    elif len(ColumnTypes[0]) == 1:
-        for item in ColumnTypes:
-            ColumnDict[item['field']] = 'unknown'
-    else:
-        for item in ColumnTypes:
-            ColumnDict[item['field']] = item['type']
-    Data = Data[list(ColumnDict.keys())]
-    ColumnDict = GetNewColumnType(Data, ColumnDict)
+def TaskAPIs(Data, ColumnTypes: List[dict] = [], task=None, DataAsp=None, Num=10, mode=1, Limit=0, Profile=None,
+             Quota=None, Rows="dict"):
+    # 列类型、数据事实与逐行数据都来自数据集画像; 同一数据集的多个任务可传入同一个 Profile
+    # Rows 决定第二个返回值: "dict" 为逐行字典, "arrow" 为 Arrow 表, None 不生成逐行数据
+    if Profile is None:
+        Profile = DatasetProfile(Data, ColumnTypes, DataAsp)
+    ColumnDict = Profile.column_types
+    DataAsp = Profile
 
     # mode 1:单项任务的个人建议
     if mode == 1:
         if type(task) != str:
             raise Exception(print("Must input single task string in SingleTask mode!"))
-        recos = IndivRecWithSingleTask(Data=Data, ColumnTypes=ColumnDict, task=task, DataAsp=DataAsp, Num=0)
+        recos = IndivRecWithSingleTask(Data=Data, ColumnTypes=ColumnDict, task=task, DataAsp=DataAsp, Num=0,
+                                       Limit=Limit, Quota=Quota)
     # mode 2:承担多项任务的个人建议
     elif mode == 2:
         if type(task) != list:
@@ -311,7 +382,8 @@ def TaskAPIs(Data, ColumnTypes: List[dict] = [], task=None, DataAsp=None, Num=10
     else:
         raise Exception(print("No %s Mode!" % (mode)))
 
-    df = Data.where((pd.notnull(Data)), None)
-    df = list(df.T.to_dict().values())
-    return recos, df
+    return recos, Profile.records(Rows)
+
+
+TaskVisAPIs = TaskAPIs
 
@@ -1,14 +1,13 @@
-
+import argparse
 import json
-from tqdm import tqdm
-import pandas as pd
-import runpy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import time
 
-with open("../dataset/message.json", 'r') as file:
-    data_list = json.load(file)
-from Transform import GetNewColumnType
+from DatasetProfile import load_profile
+from task_chart_generate import generate_charts
 
-chart_list = []
+DATASET_DIR = "../dataset"
 
 task_rank = {
     'change_over_time': 3,
@@ -22,23 +21,67 @@ task_rank = {
     'retrieve_value': 1
 }
 tasks = list(task_rank.keys())
-namespace = runpy.run_module(mod_name='task_chart_generate')
-for task in tqdm(tasks):
-    for num in tqdm(range(len(data_list))):
-        print(data_list[num]['id'])
-        df = pd.read_csv(f"../dataset/data_files/{data_list[num]['id']}.csv")
-        columnType = data_list[num]['columns']
-        types = []
-        for i in columnType:
-            types.append({"field": i, "type": columnType[i]})
-        # 调用函数
-        ans = namespace[f'{task}_chart'](df, types)
-        for chart in ans:
-            chart['task'] = task
-            chart['dataset'] = f"{data_list[num]['id']}.csv"
-        if len(ans) == 0:
-            continue
-        chart_df = pd.DataFrame(ans)
-        # print(chart_df)
-        chart_df = chart_df[['dataset', 'task', 'chart_type', 'mark', 'vega-lite']]
-        chart_df.to_csv(f'{task}.csv', mode='a', index=False, header=False, encoding='utf-8')
+
+
+def generate(job):
+    dataset_id, columnType, task = job
+    start = time()
+    types = []
+    for i in columnType:
+        types.append({"field": i, "type": columnType[i]})
+    # CSV 分块扫描得到列类型与 ASP 数据事实, 按 (路径, 修改时间) 缓存, 同一数据集的各任务只计算一次
+    profile = load_profile(f"{DATASET_DIR}/data_files/{dataset_id}.csv", types)
+    # 调用函数; 画像里已有求解所需的全部信息, 不必把整张表读入内存
+    ans = generate_charts(None, types, task, profile)
+    for chart in ans:
+        chart['task'] = task
+        chart['dataset'] = f"{dataset_id}.csv"
+    return dataset_id, task, ans, time() - start
+
+
+def write_charts(task, ans):
+    import pandas as pd
+
+    chart_df = pd.DataFrame(ans)
+    # print(chart_df)
+    chart_df = chart_df[['dataset', 'task', 'chart_type', 'mark', 'vega-lite']]
+    chart_df.to_csv(f'{task}.csv', mode='a', index=False, header=False, encoding='utf-8')
+
+
+def main(workers=None, datasets=None, task_list=None):
+    with open(f"{DATASET_DIR}/message.json", 'r') as file:
+        data_list = json.load(file)
+    if datasets:
+        data_list = [data for data in data_list if str(data['id']) in datasets]
+    task_list = task_list or tasks
+    # 任务按数据集排列, 每个数据集的全部任务作为一个块交给同一进程: 画像只计算一次, 求解会话也可复用
+    jobs = [(data['id'], data['columns'], task) for data in data_list for task in task_list]
+    workers = workers or min(os.cpu_count(), len(data_list)) or 1
+    start = time()
+    if workers == 1:
+        # 单个数据集时直接在当前进程运行, 省去进程池的启动开销
+        results = map(generate, jobs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(generate, jobs, chunksize=len(task_list))
+    try:
+        # 结果按提交顺序返回, 由主进程统一写文件
+        for dataset_id, task, ans, elapsed in results:
+            print("%s %s: %d charts, %.2fs" % (dataset_id, task, len(ans), elapsed))
+            if len(ans) == 0:
+                continue
+            write_charts(task, ans)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    print("%d jobs finished in %.2fs" % (len(jobs), time() - start))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate target charts for every (dataset, task) pair.")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: one per core)")
+    parser.add_argument('--dataset', action='append', help="only run the given dataset id (repeatable)")
+    parser.add_argument('--task', action='append', choices=tasks, help="only run the given task (repeatable)")
+    args = parser.parse_args()
+    main(args.workers, args.dataset, args.task)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 被测模块以脚本目录为导入根 (与 result.py 等脚本的运行方式一致)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
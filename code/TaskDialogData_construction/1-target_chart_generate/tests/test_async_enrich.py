@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import AsyncEnrich
+from AsyncEnrich import AsyncLLMClient, TokenBucket, enrich
+
+
+class FakeCompletions:
+    """假的 chat.completions: 每条消息的前 failures 次调用以 error 失败, 之后返回 JSON; 记录调用次数与并发峰值"""
+
+    def __init__(self, failures=0, error=None, delay=0.01):
+        self.failures = failures
+        self.error = error
+        self.delay = delay
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model, messages, **kwargs):
+        key = messages[-1]['content']
+        self.calls[key] = self.calls.get(key, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.calls[key] <= self.failures:
+                if self.error is None:
+                    content = "not json"
+                else:
+                    raise self.error
+            else:
+                content = json.dumps({'echo': key})
+        finally:
+            self.in_flight -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = SimpleNamespace(completions=completions)
+
+    async def close(self):
+        pass
+
+
+def prompts(n):
+    return [[{'role': 'user', 'content': 'item %d' % i}] for i in range(n)]
+
+
+def run(completions, items, **options):
+    async def main():
+        client = AsyncLLMClient(client=FakeClient(completions), **options)
+        return await enrich(client, items)
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(AsyncEnrich, 'BACKOFF_BASE', 0.001)
+
+
+def test_retries_until_success():
+    completions = FakeCompletions(failures=2)
+    results = run(completions, prompts(5), retries=3, rate=1000, burst=100)
+    assert results == [{'echo': 'item %d' % i} for i in range(5)]
+    assert all(count == 3 for count in completions.calls.values())
+
+
+def test_retry_cap_gives_none():
+    completions = FakeCompletions(failures=10)
+    results = run(completions, prompts(2), retries=3, rate=1000, burst=100)
+    assert results == [None, None]
+    assert all(count == 4 for count in completions.calls.values())
+
+
+def test_timeout_is_retried():
+    completions = FakeCompletions(failures=1, error=asyncio.TimeoutError())
+    results = run(completions, prompts(3), retries=2, rate=1000, burst=100)
+    assert results == [{'echo': 'item %d' % i} for i in range(3)]
+    assert all(count == 2 for count in completions.calls.values())
+
+
+def test_programming_error_is_not_retried():
+    completions = FakeCompletions(failures=1, error=KeyError('field'))
+    with pytest.raises(KeyError):
+        run(completions, prompts(1), retries=5, rate=1000, burst=100)
+    assert completions.calls == {'item 0': 1}
+
+
+def test_concurrency_cap():
+    completions = FakeCompletions(delay=0.02)
+    results = run(completions, prompts(40), concurrency=4, rate=1000, burst=100)
+    assert all(r is not None for r in results)
+    assert completions.max_in_flight == 4
+
+
+def test_none_prompts_are_skipped():
+    completions = FakeCompletions()
+    items = prompts(3)
+    items[1] = None
+    assert run(completions, items, rate=1000, burst=100)[1] is None
+    assert 'item 1' not in completions.calls
+
+
+def test_token_bucket_rate():
+    async def main():
+        bucket = TokenBucket(rate=100, burst=5)
+        start = time.monotonic()
+        for _ in range(25):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 前 5 个令牌立即可用, 其余 20 个按每秒 100 个补充
+    assert asyncio.run(main()) >= 0.18
+
+
+def status_error(status):
+    openai = pytest.importorskip("openai")
+
+    # 只用到 status_code、request 与 headers, 不依赖具体的 HTTP 库
+    response = SimpleNamespace(status_code=status, request=None, headers={})
+    return openai.APIStatusError("status %d" % status, response=response, body=None)
+
+
+def test_rate_limit_is_retried():
+    completions = FakeCompletions(failures=2, error=status_error(429))
+    results = run(completions, prompts(2), retries=3, rate=1000, burst=100)
+    assert results == [{'echo': 'item 0'}, {'echo': 'item 1'}]
+    assert all(count == 3 for count in completions.calls.values())
+
+
+def test_client_error_is_not_retried():
+    completions = FakeCompletions(failures=1, error=status_error(401))
+    assert run(completions, prompts(1), retries=3, rate=1000, burst=100) == [None]
+    assert completions.calls == {'item 0': 1}
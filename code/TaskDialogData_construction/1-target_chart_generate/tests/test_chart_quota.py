@@ -0,0 +1,76 @@
+import os
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("clingo")
+
+import RunClingo
+from ChartQuota import CHART_QUOTAS, LAYER_MARK, quota_spec, select_charts
+
+# 一个数据集的事实 (与 Cql2Asp + data_to_asp 的输出形式相同)
+QUERY = ['data("./values").', 'num_rows(100).',
+         'fieldtype("A",number).', 'cardinality("A",50).',
+         'fieldtype("B",string).', 'cardinality("B",5).',
+         'fieldtype("C",number).', 'cardinality("C",80).',
+         'fieldtype("D",string).', 'cardinality("D",8).',
+         'encoding(e0).', 'field(e0,"A").', 'encoding(e1).', 'field(e1,"B").',
+         'encoding(e2).', 'field(e2,"C").', 'encoding(e3).', 'field(e3,"D").']
+
+
+def vega(symbols):
+    """select_charts 用到的部分 Vega-Lite: 与 Asp2Vl 一样把 arc 的连续通道改名为 theta、离散通道改名为 color,
+    热力图 (LAYER_MARK) 分层"""
+    mark = None
+    encodings = {}
+    for symbol in symbols:
+        args = [str(arg) for arg in symbol.arguments]
+        if symbol.name == 'mark':
+            mark = args[0]
+        elif symbol.name in ('channel', 'field', 'type', 'aggregate', 'bin'):
+            encodings.setdefault(args[0], {})[symbol.name] = args[1]
+    encoding = {}
+    for enc in encodings.values():
+        if 'channel' not in enc:
+            continue
+        channel = enc.pop('channel')
+        if mark == 'arc':
+            channel = 'color' if enc.get('type') in ('nominal', 'ordinal') or 'bin' in enc else 'theta'
+        encoding[channel] = enc
+    spec = {'mark': mark, 'encoding': encoding}
+    return {'layer': [spec]} if mark == LAYER_MARK else spec
+
+
+@pytest.fixture(scope='module')
+def session():
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        yield RunClingo.ClingoSession(silence_warnings=True)
+    finally:
+        os.chdir(cwd)
+
+
+def charts(models):
+    return [SimpleNamespace(props=vega(symbols)) for symbols in models]
+
+
+@pytest.mark.parametrize('task', sorted(CHART_QUOTAS))
+def test_solver_quotas_match_select_charts(session, task):
+    quota = quota_spec(task)
+    solved = charts(session.solve(QUERY + quota['facts'], task, quota=quota))
+    # 求解器选出的每个图表都能被 select_charts 按同样的顺序接受
+    picked = select_charts(solved, task)
+    assert [chart['vega-lite'] for chart in picked] == [chart.props for chart in solved]
+    full = select_charts(charts(session.solve(QUERY + quota['facts'], task)), task)
+    if not any(branch.get('judge_first', False) for branch in CHART_QUOTAS[task]['branches']):
+        # 没有 judge_first 分支时, 两种方式各类图表的数量相同
+        assert Counter(chart['chart_type'] for chart in picked) == Counter(chart['chart_type'] for chart in full)
+
+
+def test_theta_slots_are_filled(session):
+    quota = quota_spec('part_to_whole')
+    solved = charts(session.solve(QUERY + quota['facts'], 'part_to_whole', quota=quota))
+    with_field = sum('field' in chart.props['encoding']['theta'] for chart in solved)
+    assert (with_field, len(solved) - with_field) == (2, 2)
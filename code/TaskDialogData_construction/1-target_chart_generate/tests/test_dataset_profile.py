@@ -0,0 +1,48 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from DatasetProfile import DatasetProfile
+
+DATA = pd.DataFrame({'A': [1.0, None, 3.0], 'B': ['x', 'y', None]})
+
+
+def profile(data=DATA):
+    # 只设置 records 用到的部分, 不经过需要 helper/Transform 的列类型推断与 ASP 转换
+    result = DatasetProfile.__new__(DatasetProfile)
+    result._data = data
+    result._rows = None
+    result._arrow = None
+    return result
+
+
+def test_dict_rows():
+    p = profile()
+    rows = p.records("dict")
+    # 与原 TaskAPIs 逐行返回的数据相同, 只生成一次
+    expected = list(DATA.where(pd.notnull(DATA), None).T.to_dict().values())
+    assert pd.DataFrame(rows).equals(pd.DataFrame(expected))
+    assert p.records("dict") is rows
+
+
+def test_none_never_builds_rows(monkeypatch):
+    def fail(self):
+        raise AssertionError("rows built")
+
+    monkeypatch.setattr(DatasetProfile, 'rows', property(fail))
+    monkeypatch.setattr(DatasetProfile, 'arrow', property(fail))
+    assert profile().records(None) is None
+
+
+def test_arrow_table_is_cached():
+    pytest.importorskip("pyarrow")
+    p = profile()
+    table = p.records("arrow")
+    assert table.num_rows == 3 and table.column_names == ['A', 'B']
+    assert table.column('B').to_pylist() == ['x', 'y', None]
+    assert p.records("arrow") is table
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        profile().records("rows")
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from EditFunc import (ApproxEditCostMatrix, EditCostMatrix, EncodingEditOps, GetCost, MarkEditOps,
+                      TransformEditOps)
+
+TASK = 'correlate'
+EMPTY = {'layer': [{'mark': {'type': ''}, 'encoding': {}}]}
+
+
+def spec(mark, encoding, transform=None):
+    layer = {'mark': {'type': mark}, 'encoding': encoding}
+    if transform is not None:
+        layer['transform'] = transform
+    return {'layer': [layer]}
+
+
+SPECS = [
+    spec('point', {'x': {'field': 'A', 'type': 'quantitative'}, 'y': {'field': 'B', 'type': 'quantitative'}}),
+    spec('point', {'x': {'field': 'B', 'type': 'quantitative'}, 'y': {'field': 'A', 'type': 'quantitative'}}),
+    spec('bar', {'x': {'field': 'C', 'type': 'nominal'},
+                 'y': {'field': 'A', 'type': 'quantitative', 'aggregate': 'mean'}}),
+    spec('bar', {'x': {'field': 'C', 'type': 'nominal'}, 'y': {'field': 'A', 'type': 'quantitative', 'aggregate': 'sum'},
+                 'color': {'field': 'D', 'type': 'nominal'}}),
+    spec('line', {'x': {'field': 'A', 'type': 'quantitative', 'bin': True},
+                  'y': {'field': 'B', 'type': 'quantitative', 'aggregate': 'count'}}),
+    spec('point', {'x': {'field': 'A', 'type': 'quantitative'}, 'y': {'field': 'B', 'type': 'quantitative'},
+                   'size': {'field': 'C', 'type': 'quantitative'}},
+         transform=[{'loess': 'B', 'on': 'A'}]),
+]
+
+
+def pair_cost(s, d, task=None):
+    cost = sum(op['cost'] for op in MarkEditOps(s, d, task))
+    cost += sum(op['cost'] for op in TransformEditOps(s, d))
+    cost += sum(op['cost'] for op in EncodingEditOps(SimpleNamespace(props=s, cost=0, Ops=[]),
+                                                     SimpleNamespace(props=d, cost=0, Ops=[])))
+    return cost
+
+
+@pytest.mark.parametrize('task', [None, TASK])
+def test_matrix_matches_pairwise_edit_ops(task):
+    matrix = EditCostMatrix(SPECS, task=task)
+    checked = 0
+    for a, s in enumerate(SPECS):
+        for b, d in enumerate(SPECS):
+            try:
+                expected = pair_cost(s, d, task)
+            except KeyError:
+                # TransformEditOps 不支持只在目标一侧出现的聚合
+                continue
+            assert matrix[a, b] == pytest.approx(expected)
+            checked += 1
+    assert checked >= len(SPECS) * 2
+
+
+def test_duplicate_encodings_are_searched_once(monkeypatch):
+    import EditFunc
+
+    # 标记或变换不同而通道映射相同的 spec 共用一次编码搜索
+    specs = SPECS + [spec('line', SPECS[0]['layer'][0]['encoding']),
+                     spec('point', SPECS[0]['layer'][0]['encoding'], transform=[{'loess': 'B', 'on': 'A'}])]
+    expected = EditCostMatrix(SPECS, task=TASK)
+    calls = []
+    search = EditFunc.EncodingEditOps
+    monkeypatch.setattr(EditFunc, 'EncodingEditOps', lambda s, d: calls.append(1) or search(s, d))
+    matrix = EditCostMatrix(specs, task=TASK)
+    # SPECS[4] 与 SPECS[0] 的通道映射也相同
+    assert len(calls) == (len(SPECS) - 1) ** 2
+    assert matrix[:len(SPECS), :len(SPECS)] == pytest.approx(expected)
+    for extra in (len(SPECS), len(SPECS) + 1):
+        for b, d in enumerate(specs):
+            try:
+                assert matrix[extra, b] == pytest.approx(pair_cost(specs[extra], d, TASK))
+            except KeyError:
+                continue
+
+
+def test_matrix_from_empty_chart_matches_get_cost():
+    matrix = EditCostMatrix([EMPTY], SPECS, task=TASK)
+    for b, d in enumerate(SPECS):
+        assert matrix[0, b] == pytest.approx(GetCost(d, TASK)[0])
+
+
+def test_approx_matrix_is_an_upper_bound():
+    exact = EditCostMatrix(SPECS, task=TASK)
+    approx = ApproxEditCostMatrix(SPECS, task=TASK)
+    assert (approx >= exact - 1e-9).all()
+    assert (approx.diagonal() == 0).all()
@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from EditCostSolver import (EDIT_COST_DIR, MIN_COST, edit_op_set, linear_program, load_rule_set, solve_costs)
+
+
+@pytest.fixture(scope='module')
+def rule_set():
+    return load_rule_set()
+
+
+@pytest.fixture(scope='module')
+def solved(rule_set):
+    return solve_costs(rule_set, cache_dir=None)
+
+
+def load(name):
+    with open(os.path.join(EDIT_COST_DIR, name), 'r', encoding='UTF-8') as f:
+        return json.load(f)
+
+
+def test_every_rule_keeps_mincost_gap(rule_set, solved):
+    costs, id_map = solved
+    # 取整后的代价仍满足规则链中每一步与规则集之间的约束
+    A, b, _, _ = linear_program(rule_set)
+    assert (np.array(A) @ np.array(costs) <= np.array(b) + 1e-9).all()
+    for rs in rule_set:
+        for rule in rs['rules']:
+            chain = [item if isinstance(item, list) else [item] for item in rule]
+            for lower, upper in zip(chain, chain[1:]):
+                for u in lower:
+                    for v in upper:
+                        assert costs[id_map[v]] - costs[id_map[u]] >= MIN_COST - 1e-9, (u, v)
+    assert min(costs) >= MIN_COST
+
+
+def test_solution_is_deterministic(rule_set, solved):
+    assert solve_costs(rule_set, cache_dir=None) == solved
+
+
+def test_checked_in_tables_match_solver(rule_set, solved):
+    costs, id_map = solved
+    assert load('idMap.json') == id_map
+    assert load('costs.json') == costs
+    assert load('editOpSet.json') == edit_op_set(rule_set, costs, id_map)
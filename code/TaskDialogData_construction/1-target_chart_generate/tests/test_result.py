@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("clingo")
+
+from RunClingo import ChartSpec, Result, canonical_json
+
+VL = {'mark': 'bar', 'encoding': {'x': {'field': 'A', 'type': 'nominal'},
+                                  'y': {'field': 'B', 'type': 'quantitative', 'aggregate': 'sum'}}}
+
+
+def result(props):
+    # 与 ProcessAnswers 一样, 求解得到的 Result 经 Asp2Vl 后 props 被替换为 Vega-Lite
+    res = Result([], cost=1.0)
+    res.props = props
+    return res
+
+
+def test_numpy_scalars_share_the_python_key():
+    np = pytest.importorskip("numpy")
+    vl = {'mark': 'bar', 'encoding': {'x': {'field': 'A', 'bin': {'maxbins': np.int64(10)}},
+                                      'y': {'field': 'B', 'scale': {'domain': [np.float64(0.5), 2]}}}}
+    plain = {'mark': 'bar', 'encoding': {'x': {'field': 'A', 'bin': {'maxbins': 10}},
+                                         'y': {'field': 'B', 'scale': {'domain': [0.5, 2]}}}}
+    assert ChartSpec.from_vl(vl).key == canonical_json(plain)
+    assert result(vl) == result(plain)
+    with pytest.raises(TypeError):
+        canonical_json({'x': object()})
+
+
+def test_fingerprint_is_reset_when_props_are_replaced():
+    res = result(VL)
+    key = res.fingerprint()
+    assert res.fingerprint() is key
+    res.props = dict(VL, mark='line')
+    assert res.fingerprint() != key
+    assert res != result(VL)
+
+
+def test_spec_is_built_from_current_props():
+    res = result({'mark': 'bar', 'encoding': dict(VL['encoding'])})
+    res.fingerprint()
+    res.props['encoding']['color'] = {'field': 'C', 'type': 'nominal'}
+    assert 'color' in res.to_spec().as_vl()['encoding']
+    assert res.fingerprint() == res.to_spec().key